@@ -0,0 +1,1427 @@
+'''
+Benchmarks for the search of the minimax agents.
+
+Usage:
+    python benchmark.py nodes --agent minimax --depth 3
+    python benchmark.py memory --agent minimax --depth 4
+    python benchmark.py tt --agent minimax --depth 6 --sizes 1 16 64
+    python benchmark.py depth --agent minimax --time 1
+    python benchmark.py ordering --agent minimax --depth 6
+    python benchmark.py pvs --agent minimax --depth 8
+    python benchmark.py selective --agent minimax --time 0.5
+    python benchmark.py bounds --agent minimax --depth 8
+    python benchmark.py endgame --agent minimax --cards 10 12 14 16 18
+    python benchmark.py symmetry --agent minimax --depth 5
+    python benchmark.py parallel --agent minimax --depth 8 --workers 2 4 8 16
+    python benchmark.py session --agent minimax --time 0.5
+    python benchmark.py mcts --agent minimax --time 1 --batches 1 4 16
+    python benchmark.py evaluation --agent minimax --positions 10000 --depth 8
+    python benchmark.py simulation --games 10000 --policies random greedy shallow
+    python benchmark.py classes --agent minimax --plies 10 --copies 2000
+    python benchmark.py harness --agent minimax --time 0.05 --games 2
+    python benchmark.py tournament --agent minimax --time 0.05 --games 40 --workers 1 2 4
+    python benchmark.py sprt --bounds 0 30 --elos -30 0 15 30 60 --runs 1000
+    python benchmark.py pairs --games 10000 --policies greedy shallow
+'''
+
+import argparse
+import concurrent.futures
+import copy
+import importlib
+import json
+import random
+import time
+import tracemalloc
+from os import listdir
+from os.path import abspath, join, dirname, isdir
+
+from utils.classes import Card, Player
+
+from bitboard import BoardState, HOUSES, HOUSE_SIZES, NUM_SYMMETRIES, popcount
+import evaluation
+import mcts
+from parallel import ParallelSearch
+from search import Search, Session
+
+# Set the path of the file
+path = dirname(abspath(__file__))
+
+parser = argparse.ArgumentParser(description="Benchmarks for the minimax agents")
+subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+nodes_parser = subparsers.add_parser('nodes', help="nodes/sec of the list-based and bitboard searches")
+nodes_parser.add_argument('--agent', type=str, help="agent module to benchmark", default='minimax')
+nodes_parser.add_argument('--depth', type=int, help="depth of the search", default=3)
+nodes_parser.add_argument('--boards', type=int, help="number of random boards when boards/ is empty", default=5)
+
+memory_parser = subparsers.add_parser('memory', help="memory allocated by the search")
+memory_parser.add_argument('--agent', type=str, help="agent module to benchmark", default='minimax')
+memory_parser.add_argument('--depth', type=int, help="depth of the search", default=4)
+memory_parser.add_argument('--boards', type=int, help="number of random boards when boards/ is empty", default=5)
+memory_parser.add_argument('--legacy', action='store_true', help="also measure the list-based search (slow)")
+
+tt_parser = subparsers.add_parser('tt', help="hit rate of the transposition table by memory cap")
+tt_parser.add_argument('--agent', type=str, help="agent module to benchmark", default='minimax')
+tt_parser.add_argument('--depth', type=int, help="depth of the search", default=6)
+tt_parser.add_argument('--boards', type=int, help="number of random boards when boards/ is empty", default=5)
+tt_parser.add_argument('--sizes', type=float, nargs='+', help="memory caps to try in MiB", default=[0.01, 1, 16, 64])
+
+depth_parser = subparsers.add_parser('depth', help="depth reached by iterative deepening in self-play games")
+depth_parser.add_argument('--agent', type=str, help="agent module to benchmark", default='minimax')
+depth_parser.add_argument('--time', type=float, help="time budget per move in seconds", default=1.0)
+depth_parser.add_argument('--boards', type=int, help="number of random boards when boards/ is empty", default=2)
+
+ordering_parser = subparsers.add_parser('ordering', help="nodes and cutoffs with and without move ordering")
+ordering_parser.add_argument('--agent', type=str, help="agent module to benchmark", default='minimax')
+ordering_parser.add_argument('--depth', type=int, help="depth of the search", default=6)
+ordering_parser.add_argument('--boards', type=int, help="number of random boards when boards/ is empty", default=5)
+
+pvs_parser = subparsers.add_parser('pvs', help="nodes of alpha-beta, PVS and PVS with aspiration windows")
+pvs_parser.add_argument('--agent', type=str, help="agent module to benchmark", default='minimax')
+pvs_parser.add_argument('--depth', type=int, help="depth of the search", default=8)
+pvs_parser.add_argument('--boards', type=int, help="number of random boards when boards/ is empty", default=5)
+
+selective_parser = subparsers.add_parser('selective', help="depth and strength with late move reductions and futility pruning")
+selective_parser.add_argument('--agent', type=str, help="agent module to benchmark", default='minimax')
+selective_parser.add_argument('--time', type=float, help="time budget per move in seconds", default=0.5)
+selective_parser.add_argument('--boards', type=int, help="number of random boards when boards/ is empty", default=5)
+selective_parser.add_argument('--plies', type=int, help="random plies played before measuring the depth", default=8)
+
+bounds_parser = subparsers.add_parser('bounds', help="nodes with and without the decided-banner bounds")
+bounds_parser.add_argument('--agent', type=str, help="agent module to benchmark", default='minimax')
+bounds_parser.add_argument('--depth', type=int, help="depth of the search", default=8)
+bounds_parser.add_argument('--boards', type=int, help="number of random boards when boards/ is empty", default=5)
+bounds_parser.add_argument('--plies', type=int, help="random plies played before searching", default=16)
+
+endgame_parser = subparsers.add_parser('endgame', help="time of the exact endgame solver by cards left")
+endgame_parser.add_argument('--agent', type=str, help="agent module to benchmark", default='minimax')
+endgame_parser.add_argument('--boards', type=int, help="number of random boards when boards/ is empty", default=10)
+endgame_parser.add_argument('--cards', type=int, nargs='+', help="cards left on the board", default=[10, 12, 14, 16, 18])
+
+symmetry_parser = subparsers.add_parser('symmetry', help="cache entries with and without the symmetry canonicalization")
+symmetry_parser.add_argument('--agent', type=str, help="agent module to benchmark", default='minimax')
+symmetry_parser.add_argument('--depth', type=int, help="depth of the search", default=5)
+symmetry_parser.add_argument('--boards', type=int, help="number of random boards when boards/ is empty", default=3)
+symmetry_parser.add_argument('--plies', type=int, help="random plies played before searching", default=8)
+symmetry_parser.add_argument('--cards', type=int, help="cards left in the solved endgames", default=12)
+
+parallel_parser = subparsers.add_parser('parallel', help="speedup of the multi-process search")
+parallel_parser.add_argument('--agent', type=str, help="agent module to benchmark", default='minimax')
+parallel_parser.add_argument('--depth', type=int, help="depth of the search", default=8)
+parallel_parser.add_argument('--boards', type=int, help="number of random boards when boards/ is empty", default=5)
+parallel_parser.add_argument('--plies', type=int, help="random plies played before searching", default=4)
+parallel_parser.add_argument('--workers', type=int, nargs='+', help="numbers of worker processes", default=[2, 4])
+
+session_parser = subparsers.add_parser('session', help="depth reached with and without a session kept between moves")
+session_parser.add_argument('--agent', type=str, help="agent module to benchmark", default='minimax')
+session_parser.add_argument('--time', type=float, help="time budget per move in seconds", default=0.5)
+session_parser.add_argument('--boards', type=int, help="number of random boards when boards/ is empty", default=3)
+session_parser.add_argument('--depth', type=int, help="depth of the fixed-depth comparison", default=7)
+
+mcts_parser = subparsers.add_parser('mcts', help="rollouts/sec and win rate of the MCTS agent against minimax")
+mcts_parser.add_argument('--agent', type=str, help="minimax agent module to play against", default='minimax')
+mcts_parser.add_argument('--time', type=float, help="time budget per move in seconds", default=1.0)
+mcts_parser.add_argument('--boards', type=int, help="number of random boards when boards/ is empty", default=5)
+mcts_parser.add_argument('--plies', type=int, help="random plies played before measuring rollouts/sec", default=4)
+mcts_parser.add_argument('--batches', type=int, nargs='+', help="rollout batch sizes", default=[1, 4, 16])
+mcts_parser.add_argument('--workers', type=int, help="processes growing independent trees", default=1)
+mcts_parser.add_argument('--games', type=int, help="boards played twice against the minimax agent", default=10)
+mcts_parser.add_argument('--tournament-workers', type=int, help="processes playing the games", default=1)
+
+evaluation_parser = subparsers.add_parser('evaluation', help="time of the leaf evaluation one at a time and in batches")
+evaluation_parser.add_argument('--agent', type=str, help="agent module to benchmark", default='minimax')
+evaluation_parser.add_argument('--positions', type=int, help="number of leaves evaluated", default=10000)
+evaluation_parser.add_argument('--depth', type=int, help="depth of the searches", default=8)
+evaluation_parser.add_argument('--proximity', type=float, help="proximity weight, the one of the agent by default",
+                               default=None)
+evaluation_parser.add_argument('--boards', type=int, help="number of random boards when boards/ is empty", default=10)
+
+simulation_parser = subparsers.add_parser('simulation', help="games/sec and win rates of the batched simulation")
+simulation_parser.add_argument('--games', type=int, help="number of games per pair of policies", default=10000)
+simulation_parser.add_argument('--policies', type=str, nargs='+', help="policies of simulation.py",
+                               default=['random', 'greedy', 'shallow'])
+simulation_parser.add_argument('--check', type=int, help="games checked move for move against BoardState", default=100)
+
+classes_parser = subparsers.add_parser('classes', help="memory and deepcopy time of the Card and Player objects")
+classes_parser.add_argument('--agent', type=str, help="agent module whose rules play the moves", default='minimax')
+classes_parser.add_argument('--plies', type=int, help="random plies played before copying", default=10)
+classes_parser.add_argument('--copies', type=int, help="number of deep copies timed", default=2000)
+
+harness_parser = subparsers.add_parser('harness', help="per-move overhead of the thread and process harnesses")
+harness_parser.add_argument('--agent', type=str, help="agent module to host", default='minimax')
+harness_parser.add_argument('--time', type=float, help="TIMEOUT of the agent in seconds", default=0.05)
+harness_parser.add_argument('--games', type=int, help="number of games played", default=2)
+
+tournament_parser = subparsers.add_parser('tournament', help="games/sec of the tournament of main_tester.py by number of workers")
+tournament_parser.add_argument('--agent', type=str, help="agent module playing both seats", default='minimax')
+tournament_parser.add_argument('--time', type=float, help="TIMEOUT of the agent in seconds", default=0.05)
+tournament_parser.add_argument('--games', type=int, help="number of games played", default=40)
+tournament_parser.add_argument('--workers', type=int, nargs='+', help="numbers of worker processes", default=[1, 2, 4])
+
+sprt_parser = subparsers.add_parser('sprt', help="error rates and games of the SPRT of main_tester.py on simulated matches")
+sprt_parser.add_argument('--bounds', type=float, nargs=2, help="Elo differences of H0 and H1", default=[0, 30])
+sprt_parser.add_argument('--alpha', type=float, help="probability of accepting H1 when H0 holds", default=0.05)
+sprt_parser.add_argument('--beta', type=float, help="probability of accepting H0 when H1 holds", default=0.05)
+sprt_parser.add_argument('--elos', type=float, nargs='+', help="true Elo differences of the simulated matches", default=[-30, 0, 15, 30, 60])
+sprt_parser.add_argument('--runs', type=int, help="simulated matches per Elo difference", default=1000)
+sprt_parser.add_argument('--games', type=int, help="maximum number of games of a match", default=10000)
+
+pairs_parser = subparsers.add_parser('pairs', help="Elo error bars of unpaired and paired games of simulated policies")
+pairs_parser.add_argument('--games', type=int, help="number of games in each mode", default=10000)
+pairs_parser.add_argument('--policies', type=str, nargs=2, help="policies of simulation.py, the Elo is the one of the first",
+                          default=['greedy', 'shallow'])
+
+
+def random_board(seed):
+    '''
+    This function creates a random board without the character names.
+
+    Parameters:
+        seed (int): seed of the board
+
+    Returns:
+        cards (list): list of Card objects
+    '''
+
+    rng = random.Random(seed)
+
+    houses = ['Varys'] + [house for house, size in zip(HOUSES, HOUSE_SIZES) for _ in range(size)]
+    rng.shuffle(houses)
+
+    return [Card(house, 'Varys' if house == 'Varys' else f"{house} {i}", i) for i, house in enumerate(houses)]
+
+
+def load_boards(count):
+    '''
+    This function loads the boards saved in boards/, or creates random ones.
+
+    Parameters:
+        count (int): number of random boards if there are no saved boards
+
+    Returns:
+        boards (list): list of (name, cards) tuples
+    '''
+
+    boards_path = join(path, "boards")
+    boards = []
+
+    if isdir(boards_path):
+        for filename in sorted(listdir(boards_path)):
+            if not filename.endswith(".json"):
+                continue
+
+            with open(join(boards_path, filename), 'r') as file:
+                cards = json.load(file)
+
+            boards.append((filename, [Card(card['house'], card['name'], card['location']) for card in cards]))
+
+    if not boards:
+        boards = [(f"random-{seed}", random_board(seed)) for seed in range(count)]
+
+    return boards
+
+
+def random_positions(boards, plies):
+    '''
+    This function plays random moves from each board to get midgame positions.
+
+    Parameters:
+        boards (list): list of (name, cards) tuples
+        plies (int): number of random moves to play
+
+    Returns:
+        positions (list): list of (name, BoardState) tuples, player 1 to move
+    '''
+
+    positions = []
+
+    for seed, (name, cards) in enumerate(boards):
+        rng = random.Random(seed)
+        state = BoardState.from_cards(cards, Player('random'), Player('random'))
+        player = 1
+
+        for _ in range(plies):
+            moves = state.get_moves()
+            if not moves:
+                break
+
+            state.make_move(rng.choice(moves), player)
+            player = 3 - player
+
+        positions.append((name, state if player == 1 else state.get_swapped()))
+
+    return positions
+
+
+def play_game(state, searches, time_budget):
+    '''
+    This function plays a game between two searches from a position.
+
+    Parameters:
+        state (BoardState): starting position, player 1 to move
+        searches (tuple): functions returning a new Search, for player 1 and player 2
+        time_budget (float): time per move in seconds
+
+    Returns:
+        winner (int): 1 or 2, or None if nobody holds a banner
+    '''
+
+    state = state.copy()
+    player = 1
+
+    while not state.is_game_over():
+        view = state if player == 1 else state.get_swapped()
+
+        move = searches[player - 1]().iterative_deepening(view, None, time.time() + time_budget)[0]
+
+        state.make_move(move, player)
+        player = 3 - player
+
+    return state.get_winner()
+
+
+def count_calls(module, name):
+    '''
+    This function wraps a module function to count how many times it is called.
+
+    Recursive calls go through the module global, so they are counted too.
+
+    Parameters:
+        module (module): module of the function
+        name (str): name of the function
+
+    Returns:
+        counter (list): one-element list holding the number of calls
+    '''
+
+    function = getattr(module, name)
+    counter = [0]
+
+    def wrapper(*args, **kwargs):
+        counter[0] += 1
+        return function(*args, **kwargs)
+
+    setattr(module, name, wrapper)
+
+    return counter
+
+
+def legacy_best_move(agent, cards, player1, player2, depth):
+    '''
+    This function runs the list-based search of an agent, as its get_move used to.
+
+    Parameters:
+        agent (module): agent module
+        cards (list): list of Card objects
+        player1 (Player): player 1
+        player2 (Player): player 2
+        depth (int): depth of the search
+
+    Returns:
+        best_move (int): location of the card
+    '''
+
+    best_move = None
+    best_score = -float('inf')
+
+    for move in agent.get_possible_moves(cards):
+        new_cards, new_player1, new_player2 = agent.simulate_move(cards, player1, player2, move, True)
+        score = agent.minimax(new_cards, new_player1, new_player2, depth - 1, False, -float('inf'), float('inf'))
+
+        if score > best_score:
+            best_score = score
+            best_move = move
+
+    return best_move
+
+
+def benchmark_nodes(args):
+    '''
+    This function compares the nodes/sec of the list-based and bitboard searches.
+
+    The moves can differ: the list-based search scores every position with
+    the banners of the root, the bitboard search with the banners of the position.
+
+    Parameters:
+        args (Namespace): command line arguments
+    '''
+
+    agent = importlib.import_module(args.agent)
+    legacy_nodes = count_calls(agent, 'minimax')
+
+    legacy_total = [0, 0.0]
+    bitboard_total = [0, 0.0]
+
+    for name, cards in load_boards(args.boards):
+        player1 = Player(args.agent)
+        player2 = Player(args.agent)
+
+        legacy_nodes[0] = 0
+        start = time.perf_counter()
+        legacy_move = legacy_best_move(agent, cards, player1, player2, args.depth)
+        legacy_time = time.perf_counter() - start
+
+        search = Search(agent.BANNER_WEIGHT, agent.CARD_WEIGHT, ordering=False, batch_leaves=False)
+        start = time.perf_counter()
+        bitboard_move = search.get_best_move(BoardState.from_cards(cards, player1, player2), args.depth, float('inf'))
+        bitboard_time = time.perf_counter() - start
+
+        legacy_total[0] += legacy_nodes[0]
+        legacy_total[1] += legacy_time
+        bitboard_total[0] += search.nodes
+        bitboard_total[1] += bitboard_time
+
+        print(f"{name}: list {legacy_nodes[0] / legacy_time:.0f} nodes/s, "
+              f"bitboard {search.nodes / bitboard_time:.0f} nodes/s, "
+              f"moves {legacy_move} {bitboard_move}")
+
+    legacy_rate = legacy_total[0] / legacy_total[1]
+    bitboard_rate = bitboard_total[0] / bitboard_total[1]
+
+    print(f"total: list {legacy_rate:.0f} nodes/s, bitboard {bitboard_rate:.0f} nodes/s, "
+          f"speedup {bitboard_rate / legacy_rate:.1f}x, time speedup {legacy_total[1] / bitboard_total[1]:.1f}x")
+
+
+def measure_peak(function, *args):
+    '''
+    This function measures the peak memory allocated while calling a function.
+
+    Parameters:
+        function (function): function to call
+        args (tuple): arguments of the function
+
+    Returns:
+        result: return value of the function
+        peak (int): peak of the traced memory in bytes
+    '''
+
+    tracemalloc.start()
+    result = function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return result, peak
+
+
+def benchmark_memory(args):
+    '''
+    This function measures the memory allocated by the make/unmake search.
+
+    Parameters:
+        args (Namespace): command line arguments
+    '''
+
+    agent = importlib.import_module(args.agent)
+
+    for name, cards in load_boards(args.boards):
+        player1 = Player(args.agent)
+        player2 = Player(args.agent)
+
+        state = BoardState.from_cards(cards, player1, player2)
+        before = (state.houses[:], state.squares[:], state.varys, state.hands[0][:], state.hands[1][:], state.banners[:])
+
+        search = Search(agent.BANNER_WEIGHT, agent.CARD_WEIGHT, ordering=False)
+        search.start_search(state, float('inf'))
+        (bitboard_move, _), bitboard_peak = measure_peak(search.search_root, state, args.depth, state.get_moves())
+
+        after = (state.houses, state.squares, state.varys, state.hands[0], state.hands[1], state.banners)
+
+        line = (f"{name}: bitboard {search.nodes} nodes, peak {bitboard_peak / 1024:.1f} KiB, "
+                f"state {'restored' if before == after else 'CHANGED'}")
+
+        if args.legacy:
+            legacy_move, legacy_peak = measure_peak(legacy_best_move, agent, cards, player1, player2, args.depth)
+
+            line += (f", list peak {legacy_peak / 1024:.1f} KiB, "
+                     f"moves {legacy_move} {bitboard_move}")
+
+        print(line)
+
+
+def benchmark_tt(args):
+    '''
+    This function reports the transposition table statistics for several memory caps.
+
+    Parameters:
+        args (Namespace): command line arguments
+    '''
+
+    agent = importlib.import_module(args.agent)
+    boards = load_boards(args.boards)
+
+    for size_mb in args.sizes:
+        totals = {'nodes': 0, 'time': 0.0, 'probes': 0, 'hits': 0, 'replacements': 0}
+        moves = []
+
+        for name, cards in boards:
+            state = BoardState.from_cards(cards, Player(args.agent), Player(args.agent))
+
+            search = Search(agent.BANNER_WEIGHT, agent.CARD_WEIGHT, size_mb)
+            start = time.perf_counter()
+            moves.append(search.get_best_move(state, args.depth, float('inf')))
+            totals['time'] += time.perf_counter() - start
+            totals['nodes'] += search.nodes
+
+            stats = search.tt.get_stats()
+            for stat in ('probes', 'hits', 'replacements'):
+                totals[stat] += stats[stat]
+
+        hit_rate = totals['hits'] / totals['probes'] if totals['probes'] else 0.0
+
+        print(f"{size_mb:g} MiB ({stats['capacity']} entries): hit rate {hit_rate:.1%}, "
+              f"{totals['nodes']} nodes in {totals['time']:.2f}s, "
+              f"{totals['replacements']} replacements, moves {moves}")
+
+
+def benchmark_depth(args):
+    '''
+    This function plays self-play games and reports the depth reached at each move.
+
+    The position is always given with the player to move as player 1, which
+    is the side the search maximizes.
+
+    Parameters:
+        args (Namespace): command line arguments
+    '''
+
+    agent = importlib.import_module(args.agent)
+
+    for name, cards in load_boards(args.boards):
+        state = BoardState.from_cards(cards, Player(args.agent), Player(args.agent))
+        player = 1
+        depths = []
+        overruns = 0
+
+        while not state.is_game_over():
+            # Swap the players so that the player to move is player 1
+            view = state.copy() if player == 1 else state.get_swapped()
+
+            search = Search(agent.BANNER_WEIGHT, agent.CARD_WEIGHT)
+            start = time.time()
+            move, _, depth = search.iterative_deepening(view, agent.DEPTH, start + args.time)
+            elapsed = time.time() - start
+
+            if elapsed > args.time * 1.1:
+                overruns += 1
+
+            depths.append(f"{depth}{'*' if depth == popcount(state.occupied) else ''}({elapsed:.2f}s)")
+
+            state.make_move(move, player)
+            player = 3 - player
+
+        print(f"{name}: overruns {overruns}, depth per move (* = searched to the end): {' '.join(depths)}")
+
+
+def benchmark_ordering(args):
+    '''
+    This function compares the search with and without move ordering.
+
+    Parameters:
+        args (Namespace): command line arguments
+    '''
+
+    agent = importlib.import_module(args.agent)
+    boards = load_boards(args.boards)
+
+    for ordering in (False, True):
+        nodes = cutoffs = first_move_cutoffs = 0
+        elapsed = 0.0
+        moves = []
+
+        for name, cards in boards:
+            state = BoardState.from_cards(cards, Player(args.agent), Player(args.agent))
+
+            search = Search(agent.BANNER_WEIGHT, agent.CARD_WEIGHT, ordering=ordering)
+            start = time.perf_counter()
+            moves.append(search.iterative_deepening(state, args.depth, float('inf'))[0])
+            elapsed += time.perf_counter() - start
+
+            nodes += search.nodes
+            cutoffs += search.cutoffs
+            first_move_cutoffs += search.first_move_cutoffs
+
+        print(f"ordering {'on ' if ordering else 'off'}: {nodes} nodes in {elapsed:.2f}s, {cutoffs} cutoffs, "
+              f"{first_move_cutoffs / cutoffs if cutoffs else 0:.1%} on the first move, moves {moves}")
+
+
+def benchmark_pvs(args):
+    '''
+    This function compares plain alpha-beta with the principal variation search.
+
+    Parameters:
+        args (Namespace): command line arguments
+    '''
+
+    agent = importlib.import_module(args.agent)
+    boards = load_boards(args.boards)
+
+    variants = [
+        ('alpha-beta', {}),
+        ('pvs', {'pvs': True}),
+        ('pvs + aspiration', {'pvs': True, 'aspiration_window': agent.ASPIRATION_WINDOW}),
+    ]
+
+    reference_moves = None
+
+    for label, options in variants:
+        nodes = researches = aspiration_failures = 0
+        elapsed = 0.0
+        moves = []
+
+        for name, cards in boards:
+            state = BoardState.from_cards(cards, Player(args.agent), Player(args.agent))
+
+            search = Search(agent.BANNER_WEIGHT, agent.CARD_WEIGHT, **options)
+            start = time.perf_counter()
+            moves.append(search.iterative_deepening(state, args.depth, float('inf'))[0])
+            elapsed += time.perf_counter() - start
+
+            nodes += search.nodes
+            researches += search.researches
+            aspiration_failures += search.aspiration_failures
+
+        if reference_moves is None:
+            reference_moves = moves
+
+        print(f"{label}: {nodes} nodes in {elapsed:.2f}s, {researches} re-searches, "
+              f"{aspiration_failures} aspiration failures, moves {moves}"
+              f"{'' if moves == reference_moves else ' MISMATCH'}")
+
+
+def benchmark_selective(args):
+    '''
+    This function measures late move reductions and futility pruning.
+
+    It reports the average depth reached in the time budget on midgame
+    positions, then plays each board twice, once from each seat, between
+    the selective search and the unreduced one.
+
+    Parameters:
+        args (Namespace): command line arguments
+    '''
+
+    agent = importlib.import_module(args.agent)
+    boards = load_boards(args.boards)
+
+    def make_search(**options):
+        return lambda: Search(agent.BANNER_WEIGHT, agent.CARD_WEIGHT, pvs=agent.PVS,
+                              aspiration_window=agent.ASPIRATION_WINDOW, **options)
+
+    variants = [
+        ('unreduced', make_search()),
+        ('futility', make_search(futility=True)),
+        ('lmr', make_search(lmr=True)),
+        ('lmr + futility', make_search(lmr=True, futility=True)),
+    ]
+
+    positions = random_positions(boards, args.plies)
+
+    for label, new_search in variants:
+        depths = []
+        nodes = 0
+
+        for name, state in positions:
+            search = new_search()
+            depths.append(search.iterative_deepening(state, None, time.time() + args.time)[2])
+            nodes += search.nodes
+
+        print(f"{label}: average depth {sum(depths) / len(depths):.2f} in {args.time}s, "
+              f"{nodes / (args.time * len(positions)):.0f} nodes/s, depths {depths}")
+
+    unreduced = variants[0][1]
+    selective = variants[-1][1]
+    wins = 0
+    games = 0
+
+    for name, cards in boards:
+        state = BoardState.from_cards(cards, Player(args.agent), Player(args.agent))
+
+        wins += play_game(state, (selective, unreduced), args.time) == 1
+        wins += play_game(state, (unreduced, selective), args.time) == 2
+        games += 2
+
+    print(f"lmr + futility against unreduced: {wins}/{games} wins")
+
+
+def benchmark_bounds(args):
+    '''
+    This function compares the search with and without the decided-banner bounds.
+
+    It also counts the positions where the winner is already decided, which
+    the agents play without searching.
+
+    Parameters:
+        args (Namespace): command line arguments
+    '''
+
+    agent = importlib.import_module(args.agent)
+    positions = random_positions(load_boards(args.boards), args.plies)
+
+    decided = sum(1 for _, state in positions if state.is_outcome_decided())
+    print(f"{decided}/{len(positions)} positions with the winner decided after {args.plies} plies")
+
+    for banner_bounds in (False, True):
+        nodes = bound_cutoffs = 0
+        elapsed = 0.0
+        moves = []
+
+        for name, state in positions:
+            search = Search(agent.BANNER_WEIGHT, agent.CARD_WEIGHT, banner_bounds=banner_bounds)
+            search.start_search(state, float('inf'))
+
+            start = time.perf_counter()
+            moves.append(search.search_root(state.copy(), args.depth, state.get_moves())[0])
+            elapsed += time.perf_counter() - start
+
+            nodes += search.nodes
+            bound_cutoffs += search.bound_cutoffs
+
+        print(f"bounds {'on ' if banner_bounds else 'off'}: {nodes} nodes in {elapsed:.2f}s, "
+              f"{bound_cutoffs} bound cutoffs, moves {moves}")
+
+
+def benchmark_endgame(args):
+    '''
+    This function measures the time of the exact endgame solver.
+
+    Random moves are played from each board until at most the given number
+    of cards is left, and the position is solved with the move budget of
+    the agent.
+
+    Parameters:
+        args (Namespace): command line arguments
+    '''
+
+    agent = importlib.import_module(args.agent)
+    boards = load_boards(args.boards)
+    budget = agent.TIMEOUT - agent.TIME_MARGIN
+
+    for cards_left in args.cards:
+        times = []
+        nodes = solved = 0
+
+        for seed, (name, cards) in enumerate(boards):
+            rng = random.Random(seed)
+            state = BoardState.from_cards(cards, Player('random'), Player('random'))
+            player = 1
+
+            while popcount(state.occupied) > cards_left and state.get_moves():
+                state.make_move(rng.choice(state.get_moves()), player)
+                player = 3 - player
+
+            if player == 2:
+                state = state.get_swapped()
+
+            search = Search(agent.BANNER_WEIGHT, agent.CARD_WEIGHT, endgame_cards=cards_left)
+
+            start = time.perf_counter()
+            depth = search.iterative_deepening(state, None, time.time() + budget)[2]
+            times.append(time.perf_counter() - start)
+
+            nodes += search.nodes
+            solved += depth == popcount(state.occupied)
+
+        print(f"{cards_left} cards: {solved}/{len(boards)} solved in {budget}s, "
+              f"mean {sum(times) / len(times):.3f}s, max {max(times):.3f}s, {nodes} nodes")
+
+
+def benchmark_symmetry(args):
+    '''
+    This function measures the cache entries saved by the symmetry canonicalization.
+
+    Each position is searched, then all its 8 images are searched with the
+    same Search, as happens when a board and its rotations are played. The
+    transposition table entries and the solved endgame positions are counted
+    with and without canonical keys.
+
+    Parameters:
+        args (Namespace): command line arguments
+    '''
+
+    agent = importlib.import_module(args.agent)
+    boards = load_boards(args.boards)
+
+    midgames = [state for name, state in random_positions(boards, args.plies)]
+    endgames = []
+
+    for seed, (name, cards) in enumerate(boards):
+        rng = random.Random(seed)
+        state = BoardState.from_cards(cards, Player('random'), Player('random'))
+        player = 1
+
+        while popcount(state.occupied) > args.cards and state.get_moves():
+            state.make_move(rng.choice(state.get_moves()), player)
+            player = 3 - player
+
+        endgames.append(state if player == 1 else state.get_swapped())
+
+    for label, positions, depth in (('tt', midgames, args.depth), ('endgame', endgames, None)):
+        for images in (1, NUM_SYMMETRIES):
+            results = {}
+
+            for symmetry in (False, True):
+                nodes = entries = 0
+                start = time.perf_counter()
+
+                for state in positions:
+                    search = Search(agent.BANNER_WEIGHT, agent.CARD_WEIGHT, symmetry=symmetry, endgame_cards=args.cards)
+
+                    for transform in range(images):
+                        search.iterative_deepening(state.get_transformed(transform), depth, float('inf'))
+
+                    nodes += search.nodes
+                    entries += len(search.solved) if depth is None else search.tt.get_stats()['filled']
+
+                results[symmetry] = (nodes, entries, time.perf_counter() - start)
+
+            (plain_nodes, plain_entries, plain_time), (sym_nodes, sym_entries, sym_time) = results[False], results[True]
+            saved = 1 - sym_entries / plain_entries if plain_entries else 0.0
+
+            print(f"{label}, {images} image{'s' if images > 1 else ''}: entries {plain_entries} -> {sym_entries} "
+                  f"({saved:.1%} saved), nodes {plain_nodes} -> {sym_nodes}, time {plain_time:.2f}s -> {sym_time:.2f}s")
+
+
+def benchmark_parallel(args):
+    '''
+    This function compares the multi-process search with the single-process one.
+
+    Both search midgame positions to the same depth. The speedup is the ratio
+    of the times, the efficiency the speedup per worker and the node overhead
+    the ratio of the nodes searched. The pools are started before timing.
+
+    Parameters:
+        args (Namespace): command line arguments
+    '''
+
+    agent = importlib.import_module(args.agent)
+    positions = [state for name, state in random_positions(load_boards(args.boards), args.plies)]
+
+    options = {'pvs': agent.PVS, 'lmr': agent.LMR, 'futility': agent.FUTILITY}
+
+    def run(new_search):
+        nodes = 0
+        results = []
+        start = time.perf_counter()
+
+        for state in positions:
+            search = new_search()
+            move, score, depth = search.iterative_deepening(state, args.depth, float('inf'))
+            results.append(score)
+            nodes += search.nodes
+
+        return time.perf_counter() - start, nodes, results
+
+    single_time, single_nodes, single_scores = run(lambda: Search(agent.BANNER_WEIGHT, agent.CARD_WEIGHT, **options))
+    print(f"1 process: {single_time:.2f}s, {single_nodes} nodes")
+
+    for workers in args.workers:
+        def new_search():
+            return ParallelSearch(agent.BANNER_WEIGHT, agent.CARD_WEIGHT, workers, **options)
+
+        start = time.perf_counter()
+        new_search().get_pool()
+        startup = time.perf_counter() - start
+
+        elapsed, nodes, scores = run(new_search)
+        speedup = single_time / elapsed
+
+        print(f"{workers} workers: {elapsed:.2f}s, speedup {speedup:.2f}x, efficiency {speedup / workers:.0%}, "
+              f"node overhead {nodes / single_nodes:.2f}x, same scores {scores == single_scores}, "
+              f"pool startup {startup:.2f}s")
+
+
+def benchmark_session(args):
+    '''
+    This function measures the depth reached with a session kept between moves.
+
+    A self-play game is played on each board, then the positions where
+    player 1 is to move are searched again in order, with a new Search for
+    each move and with one Session for the game: once in the time budget to
+    compare the depths, and once to a fixed depth to compare the nodes. The
+    endgame solver is off so that every move is searched by iterative
+    deepening.
+
+    Parameters:
+        args (Namespace): command line arguments
+    '''
+
+    agent = importlib.import_module(args.agent)
+    boards = load_boards(args.boards)
+
+    options = {'pvs': agent.PVS, 'lmr': agent.LMR, 'futility': agent.FUTILITY,
+               'aspiration_window': agent.ASPIRATION_WINDOW}
+
+    games = []
+
+    for name, cards in boards:
+        state = BoardState.from_cards(cards, Player(args.agent), Player(args.agent))
+        player = 1
+        positions = []
+
+        while not state.is_game_over():
+            view = state if player == 1 else state.get_swapped()
+
+            if player == 1:
+                positions.append(view.copy())
+
+            move = Search(agent.BANNER_WEIGHT, agent.CARD_WEIGHT, **options).iterative_deepening(
+                view, None, time.time() + args.time)[0]
+
+            state.make_move(move, player)
+            player = 3 - player
+
+        games.append((name, positions))
+
+    for label in ('new search', 'session'):
+        depths = []
+        nodes = 0
+
+        for max_depth in (None, args.depth):
+            for name, positions in games:
+                session = Session()
+
+                for state in positions:
+                    if label == 'session':
+                        search = session.get_search(name, state, agent.BANNER_WEIGHT, agent.CARD_WEIGHT, **options)
+
+                    else:
+                        search = Search(agent.BANNER_WEIGHT, agent.CARD_WEIGHT, **options)
+
+                    start_nodes = search.nodes
+                    depth = search.iterative_deepening(state, max_depth, time.time() + args.time)[2]
+
+                    if max_depth is None:
+                        depths.append(depth)
+
+                    else:
+                        nodes += search.nodes - start_nodes
+
+        # Positions searched to the end reach the same depth either way
+        print(f"{label}: average depth {sum(depths) / len(depths):.2f} over {len(depths)} moves, "
+              f"{nodes} nodes to depth {args.depth}, depths {depths}")
+
+
+def benchmark_mcts(args):
+    '''
+    This function measures the MCTS agent.
+
+    It reports the rollouts/sec on midgame positions for each batch size,
+    with and without priors, then plays --games boards twice, once from
+    each seat, between the MCTS agent and the minimax agent, both through
+    their get_move with TIMEOUT = --time (and no opening book).
+
+    Parameters:
+        args (Namespace): command line arguments
+    '''
+
+    from sprt import get_elo_interval
+    from tournament import Tournament, get_sample
+
+    boards = load_boards(args.boards)
+    positions = random_positions(boards, args.plies)
+
+    for priors in (False, True):
+        for batch in args.batches:
+            rollouts = 0
+
+            for seed, (name, state) in enumerate(positions):
+                rollouts += mcts.find_move(state, time.time() + args.time, args.workers, priors, batch, seed)[2]
+
+            print(f"batch {batch}{' with priors' if priors else ''}: "
+                  f"{rollouts / (args.time * len(positions)):.0f} rollouts/s")
+
+    # The games go through the get_move of both agents, as in main_tester.py
+    settings = ({'TIMEOUT': args.time, 'TIME_MARGIN': 0, 'WORKERS': args.workers},
+                {'TIMEOUT': args.time, 'TIME_MARGIN': 0, 'BOOK_FILE': None})
+    tournament = Tournament('mcts', args.agent, args.tournament_workers, args.time * 4 + 1, settings=settings)
+
+    pending = {}
+    samples = []
+
+    for result in tournament.play(range(2 * args.games), paired=True):
+        sample = get_sample(result, pending, True)
+
+        if sample is not None:
+            samples.append(sample)
+
+    summary = tournament.get_summary()
+    elo, low, high = get_elo_interval(samples)
+
+    print(f"mcts against {args.agent}: {summary['wins'][0]}/{summary['games']} wins, "
+          f"Elo {elo:+.0f} ({low:+.0f} to {high:+.0f}) from {len(samples)} pairs, "
+          f"first player won {summary['first_wins'] / max(summary['games'], 1):.0%}")
+
+
+def benchmark_evaluation(args):
+    '''
+    This function compares the leaf evaluation of the search one leaf at a time and in batches.
+
+    Positions are played at random from the boards, then the leaves below
+    them are scored one at a time with make_move, evaluate and unmake_move,
+    and per parent with get_leaf_features and score_features of
+    evaluation.py, which do not make the moves. The scores must be the same.
+    The searches of the boards are then run without and with batch_leaves.
+
+    Parameters:
+        args (Namespace): command line arguments
+    '''
+
+    agent = importlib.import_module(args.agent)
+    proximity_weight = agent.PROXIMITY_WEIGHT if args.proximity is None else args.proximity
+    boards = load_boards(args.boards)
+    rng = random.Random(0)
+
+    search = Search(agent.BANNER_WEIGHT, agent.CARD_WEIGHT, proximity_weight=proximity_weight)
+    parents = []
+    leaves = 0
+
+    while leaves < args.positions:
+        name, cards = boards[len(parents) % len(boards)]
+        state = BoardState.from_cards(cards, Player(args.agent), Player(args.agent))
+        player = 1
+
+        for _ in range(rng.randrange(len(cards))):
+            moves = state.get_moves()
+            if not moves:
+                break
+
+            state.make_move(rng.choice(moves), player)
+            player = 3 - player
+
+        moves = state.get_moves()
+        if moves:
+            parents.append((state, moves, player))
+            leaves += len(moves)
+
+    start = time.perf_counter()
+    scalar_scores = []
+
+    for state, moves, player in parents:
+        for move in moves:
+            undo = state.make_move(move, player)
+            scalar_scores.append(search.evaluate(state))
+            state.unmake_move(undo)
+
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch_scores = []
+
+    for state, moves, player in parents:
+        batch_scores.extend(evaluation.score_features(
+            evaluation.get_leaf_features(state, moves, player, proximity_weight != 0), search.weights))
+
+    batch_time = time.perf_counter() - start
+
+    mismatches = sum(scalar != batch_score for scalar, batch_score in zip(scalar_scores, batch_scores))
+
+    print(f"{leaves} leaves below {len(parents)} positions, proximity weight {proximity_weight}")
+    print(f"make_move/evaluate: {scalar_time * 1000:.1f}ms, "
+          f"batch: {batch_time * 1000:.1f}ms ({scalar_time / batch_time:.1f}x), {mismatches} mismatches")
+
+    totals = {False: [0, 0.0], True: [0, 0.0]}
+    changed = 0
+
+    for name, cards in boards:
+        results = {}
+
+        for batch_leaves in (False, True):
+            search = Search(agent.BANNER_WEIGHT, agent.CARD_WEIGHT, tt_size_mb=agent.TT_SIZE_MB, pvs=agent.PVS,
+                            aspiration_window=agent.ASPIRATION_WINDOW, proximity_weight=proximity_weight,
+                            batch_leaves=batch_leaves)
+            state = BoardState.from_cards(cards, Player(args.agent), Player(args.agent))
+
+            start = time.perf_counter()
+            results[batch_leaves] = search.iterative_deepening(state, args.depth, float('inf'))[:2]
+            elapsed = time.perf_counter() - start
+
+            totals[batch_leaves][0] += search.nodes
+            totals[batch_leaves][1] += elapsed
+
+        changed += results[False] != results[True]
+
+        print(f"{name}: one at a time {results[False]}, batch {results[True]}")
+
+    print(f"depth {args.depth}: one at a time {totals[False][1]:.2f}s, batch {totals[True][1]:.2f}s "
+          f"({totals[False][1] / totals[True][1]:.2f}x), {changed} moves or scores changed")
+
+
+def benchmark_simulation(args):
+    '''
+    This function measures the batched simulation of simulation.py.
+
+    It first plays random games with both the batch and BoardState and
+    counts the games where they differ, then plays each pair of policies
+    on random boards and reports the games/sec and the wins of player 1.
+
+    Parameters:
+        args (Namespace): command line arguments
+    '''
+
+    import numpy as np
+    import simulation
+
+    rng = random.Random(0)
+    states = [BoardState.from_cards(random_board(seed), Player('simulation'), Player('simulation'))
+              for seed in range(args.check)]
+    batch = simulation.GameBatch.from_states([state.copy() for state in states])
+    player = 1
+
+    while not batch.over.all():
+        moves = [rng.choice(state.get_moves()) if not state.is_game_over() else 0 for state in states]
+
+        for state, move in zip(states, moves):
+            if not state.is_game_over():
+                state.make_move(move, player)
+
+        batch.play(np.array(moves))
+        player = 3 - player
+
+    winners = batch.get_winners()
+    mismatches = sum(list(batch.squares[i]) != state.squares or list(batch.banners[i]) != state.banners
+                     or winners[i] != (state.get_winner() or 0) for i, state in enumerate(states))
+
+    print(f"{len(states)} games checked against BoardState, {mismatches} mismatches")
+
+    for first in args.policies:
+        for second in args.policies:
+            start = time.perf_counter()
+            winners = simulation.play_games(args.games, (simulation.POLICIES[first], simulation.POLICIES[second]))
+            elapsed = time.perf_counter() - start
+
+            print(f"{first} against {second}: {args.games / elapsed:.0f} games/s, "
+                  f"player 1 wins {np.mean(winners == 1):.1%}")
+
+
+class PlainCard:
+    '''
+    Card with a __dict__ and the house as a string, the layout utils.classes had before __slots__.
+    '''
+
+    def __init__(self, house, name, location):
+        self.house = house
+        self.name = name
+        self.location = location
+
+
+class PlainPlayer:
+    '''
+    Player with a __dict__ and no card counts, the layout utils.classes had before __slots__.
+    '''
+
+    def __init__(self, agent, cards, banners):
+        self.agent = agent
+        self.cards = cards
+        self.banners = banners
+
+
+def benchmark_classes(args):
+    '''
+    This function compares the slotted Card and Player with plain objects.
+
+    A random game is played for some plies with the list-based rules of the
+    agent, then the state (cards, player 1, player 2) is copied as
+    try_get_move does, with the classes of utils.classes and with plain
+    objects holding the same data.
+
+    Parameters:
+        args (Namespace): command line arguments
+    '''
+
+    agent = importlib.import_module(args.agent)
+    rng = random.Random(0)
+
+    cards = random_board(0)
+    player1 = Player(args.agent)
+    player2 = Player(args.agent)
+    players = (player1, player2)
+
+    for ply in range(args.plies):
+        moves = agent.get_possible_moves(cards)
+        if not moves:
+            break
+
+        agent.make_move(cards, rng.choice(moves), players[ply % 2])
+
+    def plain_card(card):
+        return PlainCard(card.get_house(), card.get_name(), card.get_location())
+
+    def plain_player(player):
+        return PlainPlayer(player.get_agent(), {house: [plain_card(card) for card in house_cards]
+                                                for house, house_cards in player.get_cards().items()},
+                           dict(player.get_banners()))
+
+    states = [
+        ('plain', ([plain_card(card) for card in cards], plain_player(player1), plain_player(player2))),
+        ('slotted', (cards, player1, player2)),
+    ]
+
+    for label, state in states:
+        tracemalloc.start()
+        state_copy = copy.deepcopy(state)
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        for _ in range(args.copies):
+            copy.deepcopy(state)
+        elapsed = time.perf_counter() - start
+
+        print(f"{label}: {size} bytes per state, deepcopy {elapsed / args.copies * 1e6:.1f}us")
+
+    del state_copy
+
+
+def benchmark_harness(args):
+    '''
+    This function measures the per-move overhead of the harness of main.py.
+
+    The same games are played by asking the agent for each move with the
+    former harness (deep copies and a new thread pool per move) and with an
+    AgentProcess. The overhead is the time of a move outside the get_move of
+    the agent. The agent gets TIMEOUT = --time, with no time margin.
+
+    Parameters:
+        args (Namespace): command line arguments
+    '''
+
+    from harness import AgentProcess
+    from rules import get_possible_moves, make_move, set_banners
+
+    settings = {'TIMEOUT': args.time, 'TIME_MARGIN': 0, 'BOOK_FILE': None}
+    timeout = args.time * 4 + 1
+
+    agent = importlib.import_module(args.agent)
+    for name, value in settings.items():
+        setattr(agent, name, value)
+
+    agent_time = [0.0]
+    get_move = agent.get_move
+
+    def timed_get_move(*move_args):
+        start = time.perf_counter()
+        move = get_move(*move_args)
+        agent_time[0] += time.perf_counter() - start
+
+        return move
+
+    def thread_move(cards, player1, player2):
+        with concurrent.futures.ThreadPoolExecutor() as executor:
+            future = executor.submit(timed_get_move, copy.deepcopy(cards), copy.deepcopy(player1),
+                                     copy.deepcopy(player2))
+
+            return future.result(timeout=timeout)
+
+    process = AgentProcess(args.agent, settings)
+    process.wait_ready()
+
+    def process_move(cards, player1, player2):
+        return process.get_move(cards, player1, player2, timeout)
+
+    for label, ask in (('thread', thread_move), ('process', process_move)):
+        moves = 0
+        elapsed = 0.0
+        agent_time[0] = 0.0
+        process.overhead = 0.0
+
+        for seed in range(args.games):
+            cards = random_board(seed)
+            player1 = Player(args.agent)
+            player2 = Player(args.agent)
+            turn = 1
+
+            while get_possible_moves(cards):
+                start = time.perf_counter()
+                move = ask(cards, player1, player2)
+                elapsed += time.perf_counter() - start
+                moves += 1
+
+                house = make_move(cards, move, player1 if turn == 1 else player2)
+                set_banners(player1, player2, house, turn)
+                turn = 3 - turn
+
+        overhead = elapsed - agent_time[0] if label == 'thread' else process.overhead
+
+        print(f"{label}: {moves} moves, overhead {overhead / moves * 1000:.2f}ms per move")
+
+    process.close()
+
+
+def benchmark_tournament(args):
+    '''
+    This function measures how the tournament of main_tester.py scales with the workers.
+
+    The agent plays itself on the same boards (same seed) with each number
+    of workers, with TIMEOUT = --time. The speedup is relative to the first
+    number of workers; each game has its own processes, so it is bounded by
+    the number of cores.
+
+    Parameters:
+        args (Namespace): command line arguments
+    '''
+
+    from tournament import Tournament
+
+    settings = {'TIMEOUT': args.time, 'TIME_MARGIN': 0, 'BOOK_FILE': None}
+    base_rate = None
+
+    for workers in args.workers:
+        tournament = Tournament(args.agent, args.agent, workers, args.time * 4 + 1, settings=(settings, settings))
+
+        start = time.perf_counter()
+        for _ in tournament.play(range(args.games)):
+            pass
+        elapsed = time.perf_counter() - start
+
+        rate = args.games / elapsed
+        base_rate = base_rate or rate
+        wins = tournament.get_summary()['wins']
+
+        print(f"workers {workers}: {rate:.2f} games/sec, speedup {rate / base_rate:.2f}, "
+              f"wins {wins[0]} : {wins[1]}")
+
+
+def benchmark_sprt(args):
+    '''
+    This function checks the SPRT of main_tester.py on simulated matches.
+
+    Each game of a match is won by player 1 with the expected score of the
+    true Elo difference. For each difference, the share of matches accepting
+    H1 should be at most alpha at the Elo of H0 and at least 1 - beta at the
+    Elo of H1, with the mean number of games played.
+
+    Parameters:
+        args (Namespace): command line arguments
+    '''
+
+    from sprt import SPRT, elo_to_score
+
+    rng = random.Random(0)
+
+    for elo in args.elos:
+        score = elo_to_score(elo)
+        accepted = 0
+        games = 0
+
+        for _ in range(args.runs):
+            sprt = SPRT(*args.bounds, args.alpha, args.beta)
+
+            for _ in range(args.games):
+                sprt.add(1 if rng.random() < score else 0)
+
+                if sprt.get_result():
+                    break
+
+            accepted += sprt.get_result() == 'H1'
+            games += sprt.samples
+
+        print(f"Elo {elo:+g}: H1 accepted in {accepted / args.runs:.1%} of the matches, "
+              f"{games / args.runs:.0f} games on average")
+
+
+def benchmark_pairs(args):
+    '''
+    This function measures how much the paired games of main_tester.py narrow the Elo interval.
+
+    Two policies of simulation.py play --games games in each mode: each on
+    its own board with the first player alternating, then on half as many
+    boards each played twice with the seats swapped, scored by pair. The
+    share of games is the one the paired mode needs for the interval of the
+    unpaired games (the width of an interval goes with 1 / sqrt(games)).
+
+    Parameters:
+        args (Namespace): command line arguments
+    '''
+
+    import numpy as np
+    import simulation
+    from sprt import get_elo_interval
+
+    policies = [simulation.POLICIES[name] for name in args.policies]
+    rng = np.random.default_rng(0)
+    count = args.games // 2
+
+    first = simulation.play_batch(simulation.GameBatch.random(count, rng), policies, rng)
+    second = simulation.play_batch(simulation.GameBatch.random(count, rng), policies[::-1], rng)
+    games = np.concatenate([first == 1, second == 2]).astype(np.float64)
+
+    boards = simulation.GameBatch.random(count, rng)
+    swapped = boards.take(np.arange(count))
+    first = simulation.play_batch(boards, policies, rng)
+    second = simulation.play_batch(swapped, policies[::-1], rng)
+    pairs = ((first == 1).astype(np.float64) + (second == 2)) / 2
+
+    widths = []
+
+    for label, scores in (('unpaired', games), ('paired', pairs)):
+        elo, low, high = get_elo_interval(scores.tolist())
+        widths.append(high - low)
+
+        print(f"{label}: Elo {elo:+.1f} (95% interval {low:+.1f} to {high:+.1f}, width {high - low:.1f}) "
+              f"from {len(scores)} samples")
+
+    print(f"paired games need {(widths[1] / widths[0]) ** 2:.0%} of the games for the same interval")
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+
+    if args.benchmark == 'nodes':
+        benchmark_nodes(args)
+
+    elif args.benchmark == 'memory':
+        benchmark_memory(args)
+
+    elif args.benchmark == 'tt':
+        benchmark_tt(args)
+
+    elif args.benchmark == 'depth':
+        benchmark_depth(args)
+
+    elif args.benchmark == 'ordering':
+        benchmark_ordering(args)
+
+    elif args.benchmark == 'pvs':
+        benchmark_pvs(args)
+
+    elif args.benchmark == 'selective':
+        benchmark_selective(args)
+
+    elif args.benchmark == 'bounds':
+        benchmark_bounds(args)
+
+    elif args.benchmark == 'endgame':
+        benchmark_endgame(args)
+
+    elif args.benchmark == 'symmetry':
+        benchmark_symmetry(args)
+
+    elif args.benchmark == 'parallel':
+        benchmark_parallel(args)
+
+    elif args.benchmark == 'session':
+        benchmark_session(args)
+
+    elif args.benchmark == 'mcts':
+        benchmark_mcts(args)
+
+    elif args.benchmark == 'evaluation':
+        benchmark_evaluation(args)
+
+    elif args.benchmark == 'simulation':
+        benchmark_simulation(args)
+
+    elif args.benchmark == 'classes':
+        benchmark_classes(args)
+
+    elif args.benchmark == 'harness':
+        benchmark_harness(args)
+
+    elif args.benchmark == 'tournament':
+        benchmark_tournament(args)
+
+    elif args.benchmark == 'sprt':
+        benchmark_sprt(args)
+
+    elif args.benchmark == 'pairs':
+        benchmark_pairs(args)
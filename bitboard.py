@@ -0,0 +1,655 @@
+'''
+Bitboard representation of a Hand of the King position.
+
+The 6x6 grid is stored as one 36-bit mask per house (bit i is square i, the
+same numbering as Card.get_location()), plus the square of Varys. Move
+generation and capture collection are then a handful of mask operations on
+precomputed row/column ray and "between" masks instead of scans over the list
+of Card objects.
+'''
+
+import random
+
+# Houses in the tiebreak order used by calculate_winner
+HOUSES = ['Stark', 'Greyjoy', 'Lannister', 'Targaryen', 'Baratheon', 'Tyrell', 'Tully']
+HOUSE_IDS = {house: i for i, house in enumerate(HOUSES)}
+HOUSE_SIZES = [8, 7, 6, 5, 4, 3, 2]  # Number of cards of each house
+NUM_HOUSES = len(HOUSES)
+
+BOARD_SIZE = 6
+NUM_SQUARES = BOARD_SIZE * BOARD_SIZE
+EMPTY = -1  # House id of an empty square
+
+SQUARE_BITS = [1 << square for square in range(NUM_SQUARES)]
+
+# Contribution of a banner owner (nobody, player 1, player 2) to the banner difference
+OWNER_SIGNS = (0, 1, -1)
+
+# Ray directions: up, down, left, right
+DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+
+def _build_rays():
+    '''
+    This function builds the ray masks of every square.
+
+    Returns:
+        rays (list): rays[square][direction] is the mask of the squares
+            from the square (exclusive) to the edge of the board
+    '''
+
+    rays = []
+
+    for square in range(NUM_SQUARES):
+        row, col = divmod(square, BOARD_SIZE)
+        square_rays = []
+
+        for d_row, d_col in DIRECTIONS:
+            mask = 0
+            r, c = row + d_row, col + d_col
+
+            while 0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE:
+                mask |= SQUARE_BITS[r * BOARD_SIZE + c]
+                r, c = r + d_row, c + d_col
+
+            square_rays.append(mask)
+
+        rays.append(square_rays)
+
+    return rays
+
+
+def _build_between(rays):
+    '''
+    This function builds the masks of the squares strictly between two squares.
+
+    Parameters:
+        rays (list): ray masks from _build_rays
+
+    Returns:
+        between (list): between[a][b] is the mask of the squares strictly
+            between a and b, or 0 if they do not share a row or column
+    '''
+
+    between = [[0] * NUM_SQUARES for _ in range(NUM_SQUARES)]
+
+    for a in range(NUM_SQUARES):
+        for direction in range(len(DIRECTIONS)):
+            ray = rays[a][direction]
+
+            for b in range(NUM_SQUARES):
+                if ray & SQUARE_BITS[b]:
+                    # The squares between a and b are the ray of a minus the ray of b (and b itself)
+                    between[a][b] = ray & ~rays[b][direction] & ~SQUARE_BITS[b]
+
+    return between
+
+
+RAY_MASKS = _build_rays()
+LINE_MASKS = [rays[0] | rays[1] | rays[2] | rays[3] for rays in RAY_MASKS]  # Row and column without the square
+BETWEEN_MASKS = _build_between(RAY_MASKS)
+
+
+def _build_symmetries():
+    '''
+    This function builds the square maps of the symmetries of the board.
+
+    Captures only depend on rows and columns, which the rotations and
+    reflections of the square map onto rows and columns, so the 8 images of
+    a position are the same game.
+
+    Returns:
+        symmetries (list): symmetries[t][square] is the image of the square
+            by transformation t, 0 being the identity
+    '''
+
+    last = BOARD_SIZE - 1
+
+    transforms = [
+        lambda row, col: (row, col),
+        lambda row, col: (col, last - row),  # Rotations by 90, 180 and 270 degrees
+        lambda row, col: (last - row, last - col),
+        lambda row, col: (last - col, row),
+        lambda row, col: (last - row, col),  # Reflections
+        lambda row, col: (row, last - col),
+        lambda row, col: (col, row),
+        lambda row, col: (last - col, last - row),
+    ]
+
+    symmetries = []
+
+    for transform in transforms:
+        symmetry = []
+
+        for square in range(NUM_SQUARES):
+            row, col = transform(*divmod(square, BOARD_SIZE))
+            symmetry.append(row * BOARD_SIZE + col)
+
+        symmetries.append(symmetry)
+
+    return symmetries
+
+
+SYMMETRIES = _build_symmetries()
+INVERSE_SYMMETRIES = [[symmetry.index(square) for square in range(NUM_SQUARES)] for symmetry in SYMMETRIES]
+NUM_SYMMETRIES = len(SYMMETRIES)
+
+
+def _build_zobrist_keys(seed=20241):
+    '''
+    This function builds the Zobrist keys of the position features.
+
+    The keys are drawn from a seeded generator so that hashes are the same in
+    every process and every run.
+
+    Parameters:
+        seed (int): seed of the generator
+
+    Returns:
+        keys (tuple): card keys [house][square], Varys keys [square],
+            hand keys [player][house][count], banner keys [house][owner]
+            and the side to move key
+    '''
+
+    rng = random.Random(seed)
+
+    card_keys = [[rng.getrandbits(64) for _ in range(NUM_SQUARES)] for _ in range(NUM_HOUSES)]
+    varys_keys = [rng.getrandbits(64) for _ in range(NUM_SQUARES)]
+    hand_keys = [[[rng.getrandbits(64) for _ in range(size + 1)] for size in HOUSE_SIZES] for _ in range(2)]
+    banner_keys = [[rng.getrandbits(64) for _ in range(3)] for _ in range(NUM_HOUSES)]
+    side_key = rng.getrandbits(64)
+
+    return card_keys, varys_keys, hand_keys, banner_keys, side_key
+
+
+CARD_KEYS, VARYS_KEYS, HAND_KEYS, BANNER_KEYS, SIDE_KEY = _build_zobrist_keys()
+
+# Keys of the squares seen through each symmetry: [transform][house][square] and [transform][square]
+SYM_CARD_KEYS = [[[keys[symmetry[square]] for square in range(NUM_SQUARES)] for keys in CARD_KEYS]
+                 for symmetry in SYMMETRIES]
+SYM_VARYS_KEYS = [[VARYS_KEYS[symmetry[square]] for square in range(NUM_SQUARES)] for symmetry in SYMMETRIES]
+
+
+try:
+    popcount = int.bit_count  # Python 3.10+
+
+except AttributeError:
+    def popcount(mask):
+        return bin(mask).count('1')
+
+
+def squares_of(mask):
+    '''
+    This function lists the squares set in a mask, lowest first.
+
+    Parameters:
+        mask (int): bitboard
+
+    Returns:
+        squares (list): list of square indices
+    '''
+
+    squares = []
+
+    while mask:
+        low = mask & -mask
+        squares.append(low.bit_length() - 1)
+        mask ^= low
+
+    return squares
+
+
+class BoardState:
+    '''
+    A position: house masks, Varys square, and per-player hand counts and banners.
+
+    Players are numbered 1 and 2 as in main.py; hands and banners are indexed by player - 1.
+    banners[house] is the owner of the banner of the house (0 if nobody holds it).
+    hash is the Zobrist hash of the board, hand counts and banners; it does not
+    include the side to move, which the search mixes in with SIDE_KEY.
+
+    decided is the mask (bit per house id) of the houses whose banner can no
+    longer change hands: a player holds more than half of the cards of the
+    house, or no card of the house is left on the board. locked_diff is the
+    number of these banners held by player 1 minus the number held by player 2.
+
+    banner_diff and card_diff are the banners and cards in hand of player 1
+    minus those of player 2, kept up to date by make_move so that the search
+    evaluates a position in constant time.
+
+    After enable_symmetry, sym_hashes holds the hash of each of the 8 images
+    of the position by the symmetries of the board, also kept up to date by
+    make_move, and get_canonical picks the smallest one.
+    '''
+
+    __slots__ = ('houses', 'squares', 'occupied', 'varys', 'hands', 'banners', 'hash', 'decided', 'locked_diff',
+                 'banner_diff', 'card_diff', 'sym_hashes')
+
+    def __init__(self, houses, squares, varys, hands, banners):
+        self.houses = houses
+        self.squares = squares
+        self.varys = varys
+        self.hands = hands
+        self.banners = banners
+
+        self.occupied = 0
+        for mask in houses:
+            self.occupied |= mask
+
+        self.hash = self.compute_hash()
+        self.sym_hashes = None
+
+        self.banner_diff = banners.count(1) - banners.count(2)
+        self.card_diff = sum(hands[0]) - sum(hands[1])
+
+        self.decided = 0
+        self.locked_diff = 0
+
+        for house in range(NUM_HOUSES):
+            if self.is_decided(house):
+                self.decided |= 1 << house
+                self.locked_diff += (banners[house] == 1) - (banners[house] == 2)
+
+    @classmethod
+    def from_cards(cls, cards, player1, player2):
+        '''
+        This function builds a state from the objects passed to get_move.
+
+        Parameters:
+            cards (list): list of Card objects
+            player1 (Player): player 1
+            player2 (Player): player 2
+
+        Returns:
+            state (BoardState): the position
+        '''
+
+        houses = [0] * NUM_HOUSES
+        squares = [EMPTY] * NUM_SQUARES
+        varys = None
+
+        for card in cards:
+            location = card.get_location()
+
+            if card.get_name() == 'Varys':
+                varys = location
+                continue
+
+            house = HOUSE_IDS[card.get_house()]
+            houses[house] |= SQUARE_BITS[location]
+            squares[location] = house
+
+        hands = ([0] * NUM_HOUSES, [0] * NUM_HOUSES)
+        banners = [0] * NUM_HOUSES
+
+        for index, player in enumerate((player1, player2)):
+            player_cards = player.get_cards()
+            player_banners = player.get_banners()
+
+            for house, house_id in HOUSE_IDS.items():
+                hands[index][house_id] = len(player_cards.get(house, ()))
+
+                if player_banners.get(house, 0):
+                    banners[house_id] = index + 1
+
+        return cls(houses, squares, varys, hands, banners)
+
+    def copy(self):
+        '''
+        This function copies the state.
+
+        Returns:
+            state (BoardState): an independent copy
+        '''
+
+        state = BoardState(self.houses[:], self.squares[:], self.varys,
+                           (self.hands[0][:], self.hands[1][:]), self.banners[:])
+
+        if self.sym_hashes is not None:
+            state.sym_hashes = self.sym_hashes
+
+        return state
+
+    def compute_hash(self, transform=0):
+        '''
+        This function computes the Zobrist hash of the state from scratch.
+
+        Parameters:
+            transform (int): index in SYMMETRIES of the image of the position to hash
+
+        Returns:
+            hash (int): 64-bit hash of the position
+        '''
+
+        card_keys = SYM_CARD_KEYS[transform]
+        key = 0 if self.varys is None else SYM_VARYS_KEYS[transform][self.varys]
+
+        for square, house in enumerate(self.squares):
+            if house != EMPTY:
+                key ^= card_keys[house][square]
+
+        for index in range(2):
+            for house, count in enumerate(self.hands[index]):
+                key ^= HAND_KEYS[index][house][count]
+
+        for house, owner in enumerate(self.banners):
+            key ^= BANNER_KEYS[house][owner]
+
+        return key
+
+    def enable_symmetry(self):
+        '''
+        This function starts keeping the hashes of the images of the position up to date.
+        '''
+
+        self.sym_hashes = tuple(self.compute_hash(transform) for transform in range(NUM_SYMMETRIES))
+
+    def get_canonical(self):
+        '''
+        This function gets the canonical orientation of the position.
+
+        The canonical image is the one with the smallest hash, so the 8
+        images of a position share the same key. A move of the position is
+        SYMMETRIES[transform][move] in the canonical image, and a move of the
+        canonical image is INVERSE_SYMMETRIES[transform][move] here.
+
+        Returns:
+            key (int): hash of the canonical image
+            transform (int): index in SYMMETRIES of the canonical image
+        '''
+
+        hashes = self.sym_hashes
+        if hashes is None:
+            hashes = [self.compute_hash(transform) for transform in range(NUM_SYMMETRIES)]
+
+        key = min(hashes)
+
+        return key, hashes.index(key)
+
+    def get_transformed(self, transform):
+        '''
+        This function gets the image of the position by a symmetry of the board.
+
+        Parameters:
+            transform (int): index in SYMMETRIES
+
+        Returns:
+            state (BoardState): the transformed position
+        '''
+
+        symmetry = SYMMETRIES[transform]
+        houses = [0] * NUM_HOUSES
+        squares = [EMPTY] * NUM_SQUARES
+
+        for square, house in enumerate(self.squares):
+            if house != EMPTY:
+                houses[house] |= SQUARE_BITS[symmetry[square]]
+                squares[symmetry[square]] = house
+
+        return BoardState(houses, squares, None if self.varys is None else symmetry[self.varys],
+                          (self.hands[0][:], self.hands[1][:]), self.banners[:])
+
+    def is_decided(self, house):
+        '''
+        This function checks if the banner of a house can no longer change hands.
+
+        Parameters:
+            house (int): house id
+
+        Returns:
+            decided (bool): True if a player holds more than half of the cards
+                of the house or none is left on the board
+        '''
+
+        if not self.houses[house]:
+            return True
+
+        return max(self.hands[0][house], self.hands[1][house]) * 2 > HOUSE_SIZES[house]
+
+    def get_banner_bounds(self):
+        '''
+        This function bounds the banner difference of any later position.
+
+        Decided banners stay with their owner, and each undecided banner can
+        end up with either player (or nobody).
+
+        Returns:
+            lower (int): lowest possible banners of player 1 minus banners of player 2
+            upper (int): highest possible banners of player 1 minus banners of player 2
+        '''
+
+        contested = NUM_HOUSES - popcount(self.decided)
+
+        return self.locked_diff - contested, self.locked_diff + contested
+
+    def is_outcome_decided(self):
+        '''
+        This function checks if the winner of the game can no longer change.
+
+        Returns:
+            decided (bool): True if one player has more banners in every later
+                position, or every banner is decided
+        '''
+
+        lower, upper = self.get_banner_bounds()
+
+        return lower > 0 or upper < 0 or lower == upper
+
+    def get_moves_mask(self):
+        '''
+        This function gets the mask of the squares Varys can move to.
+
+        Returns:
+            mask (int): bitboard of the possible moves
+        '''
+
+        if self.varys is None:
+            return 0
+
+        return LINE_MASKS[self.varys] & self.occupied
+
+    def get_moves(self):
+        '''
+        This function gets the possible moves, in the same order as get_possible_moves.
+
+        Returns:
+            moves (list): list of possible moves
+        '''
+
+        return squares_of(self.get_moves_mask())
+
+    def get_captures(self, move):
+        '''
+        This function gets the cards collected by a move.
+
+        Parameters:
+            move (int): location of the selected card
+
+        Returns:
+            mask (int): bitboard of the selected card and the cards of its
+                house between Varys and it
+        '''
+
+        house = self.squares[move]
+
+        return (BETWEEN_MASKS[self.varys][move] & self.houses[house]) | SQUARE_BITS[move]
+
+    def make_move(self, move, player):
+        '''
+        This function makes a move for the player in place.
+
+        The banner of the house of the selected card is updated with the rules
+        of set_banners: the player with more cards of the house gets it, and on
+        a tie the player who just took a card of the house gets it.
+
+        Parameters:
+            move (int): location of the selected card
+            player (int): 1 or 2
+
+        Returns:
+            undo (tuple): record to pass to unmake_move
+        '''
+
+        house = self.squares[move]
+        captured = (BETWEEN_MASKS[self.varys][move] & self.houses[house]) | SQUARE_BITS[move]
+
+        banner = self.banners[house]
+        varys = self.varys
+        undo = (move, house, captured, varys, player, banner, self.hash, self.decided, self.locked_diff,
+                self.sym_hashes)
+
+        self.houses[house] ^= captured
+        self.occupied ^= captured
+
+        hand = self.hands[player - 1]
+        count = hand[house]
+        captured_count = popcount(captured)
+        hand[house] = count + captured_count
+        self.card_diff += captured_count if player == 1 else -captured_count
+
+        key = self.hash ^ VARYS_KEYS[varys] ^ VARYS_KEYS[move]
+        key ^= HAND_KEYS[player - 1][house][count] ^ HAND_KEYS[player - 1][house][hand[house]]
+
+        squares = self.squares
+        card_keys = CARD_KEYS[house]
+        mask = captured
+        while mask:
+            low = mask & -mask
+            square = low.bit_length() - 1
+            squares[square] = EMPTY
+            key ^= card_keys[square]
+            mask ^= low
+
+        self.varys = move
+
+        # Only the house of the selected card can change hands
+        if hand[house] >= self.hands[2 - player][house]:
+            owner = player
+
+        else:
+            owner = 3 - player
+
+        self.banners[house] = owner
+        self.banner_diff += OWNER_SIGNS[owner] - OWNER_SIGNS[banner]
+        key ^= BANNER_KEYS[house][banner] ^ BANNER_KEYS[house][owner]
+
+        if self.sym_hashes is not None:
+            self.sym_hashes = self._move_sym_hashes(move, house, captured, varys, key ^ self.hash)
+
+        self.hash = key
+
+        # The mover may have taken the majority or the last cards of the house
+        if not self.decided >> house & 1 and (hand[house] * 2 > HOUSE_SIZES[house] or not self.houses[house]):
+            self.decided |= 1 << house
+            self.locked_diff += 1 if owner == 1 else -1
+
+        return undo
+
+    def _move_sym_hashes(self, move, house, captured, varys, delta):
+        '''
+        This function updates the hashes of the images of the position after a move.
+
+        Parameters:
+            move (int): location of the selected card
+            house (int): house of the selected card
+            captured (int): bitboard of the collected cards
+            varys (int): square of Varys before the move
+            delta (int): change of the hash of the position
+
+        Returns:
+            hashes (tuple): new hashes of the 8 images
+        '''
+
+        captured_squares = squares_of(captured)
+
+        # The hands and banners are the same in every image, so only the
+        # squares of Varys and of the collected cards change with the symmetry
+        common = delta ^ VARYS_KEYS[varys] ^ VARYS_KEYS[move]
+        for square in captured_squares:
+            common ^= CARD_KEYS[house][square]
+
+        hashes = []
+
+        for transform, key in enumerate(self.sym_hashes):
+            card_keys = SYM_CARD_KEYS[transform][house]
+            varys_keys = SYM_VARYS_KEYS[transform]
+
+            key ^= common ^ varys_keys[varys] ^ varys_keys[move]
+            for square in captured_squares:
+                key ^= card_keys[square]
+
+            hashes.append(key)
+
+        return tuple(hashes)
+
+    def unmake_move(self, undo):
+        '''
+        This function takes back a move made with make_move.
+
+        Parameters:
+            undo (tuple): record returned by make_move
+        '''
+
+        move, house, captured, varys, player, banner, key, decided, locked_diff, sym_hashes = undo
+
+        self.houses[house] |= captured
+        self.occupied |= captured
+
+        captured_count = popcount(captured)
+        self.hands[player - 1][house] -= captured_count
+        self.card_diff -= captured_count if player == 1 else -captured_count
+        self.banner_diff -= OWNER_SIGNS[self.banners[house]] - OWNER_SIGNS[banner]
+
+        squares = self.squares
+        mask = captured
+        while mask:
+            low = mask & -mask
+            squares[low.bit_length() - 1] = house
+            mask ^= low
+
+        self.varys = varys
+        self.banners[house] = banner
+        self.hash = key
+        self.decided = decided
+        self.locked_diff = locked_diff
+        self.sym_hashes = sym_hashes
+
+    def get_winner(self):
+        '''
+        This function determines the winner with the rules of calculate_winner.
+
+        Returns:
+            winner (int): 1 or 2, or None if nobody holds a banner
+        '''
+
+        if self.banner_diff:
+            return 1 if self.banner_diff > 0 else 2
+
+        # On a tie, the holder of the banner of the largest house wins
+        for owner in self.banners:
+            if owner:
+                return owner
+
+        return None
+
+    def get_swapped(self):
+        '''
+        This function gets the same position seen from the other player.
+
+        Returns:
+            state (BoardState): copy of the state with players 1 and 2 swapped
+        '''
+
+        return BoardState(self.houses[:], self.squares[:], self.varys,
+                          (self.hands[1][:], self.hands[0][:]),
+                          [(3 - owner) % 3 for owner in self.banners])
+
+    def is_game_over(self):
+        '''
+        This function checks if the player to move has no possible moves.
+
+        Returns:
+            game_over (bool): True if there are no moves left
+        '''
+
+        return self.get_moves_mask() == 0
@@ -0,0 +1,260 @@
+'''
+Opening book of the minimax agents.
+
+The book maps the canonical hash of an opening position, as get_move sees
+it, to the best move found by a deep search, in the canonical orientation
+(see BoardState.get_canonical), so the rotations and reflections of a board
+share their entries. It is stored as an open-addressing hash table
+of fixed-size slots, so a lookup reads one or a few slots of a memory-mapped
+file instead of loading the whole book.
+
+Each agent reads its own book (BOOK_FILE, book_<agent>.bin), since the
+moves come from its weights and search. The entries are the positions of
+the boards the book was built from (boards/), so the book only helps in
+games started from one of these boards (--load in main.py and
+main_tester.py); a new random board misses it and is searched as usual.
+
+Usage:
+    python book.py --agent minimax --plies 3 --time 5
+'''
+
+import argparse
+import importlib
+import mmap
+import struct
+import time
+from os.path import abspath, join, dirname, isabs, isfile
+
+from bitboard import BoardState, SYMMETRIES, INVERSE_SYMMETRIES
+from search import Search
+
+# Set the path of the file
+path = dirname(abspath(__file__))
+
+MAGIC = b'GOTB'
+VERSION = 3
+
+# Header: magic, version, number of slots (a power of two)
+HEADER = struct.Struct('<4sII')
+
+# Slot: position hash (0 for an empty slot), move, depth of the search, score
+SLOT = struct.Struct('<QBBxxf')
+
+# Largest share of filled slots, so that probe sequences stay short
+MAX_LOAD = 0.5
+
+# Books opened by open_book, by path
+_books = {}
+
+
+class OpeningBook:
+    '''
+    Read-only opening book on a memory-mapped file.
+    '''
+
+    def __init__(self, filename):
+        with open(filename, 'rb') as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, slots = HEADER.unpack_from(self.data, 0)
+
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{filename} is not an opening book of version {VERSION}")
+
+        self.slots = slots
+        self.mask = slots - 1
+
+    def probe(self, key):
+        '''
+        This function looks up a position hash.
+
+        Parameters:
+            key (int): hash of the position
+
+        Returns:
+            entry (tuple): (move, depth, score), or None if the position is not in the book
+        '''
+
+        index = key & self.mask
+
+        # Linear probing until the key or an empty slot
+        for _ in range(self.slots):
+            slot_key, move, depth, score = SLOT.unpack_from(self.data, HEADER.size + index * SLOT.size)
+
+            if slot_key == key:
+                return move, depth, score
+
+            if slot_key == 0:
+                return None
+
+            index = (index + 1) & self.mask
+
+        return None
+
+    def lookup(self, state):
+        '''
+        This function gets the book move of a position.
+
+        Parameters:
+            state (BoardState): the position
+
+        Returns:
+            move (int): location of the card, or None if the position is not
+                in the book
+        '''
+
+        key, transform = state.get_canonical()
+        entry = self.probe(key)
+
+        if entry is None:
+            return None
+
+        move = INVERSE_SYMMETRIES[transform][entry[0]]
+
+        # Guard against hash collisions with positions outside the book
+        if not state.get_moves_mask() >> move & 1:
+            return None
+
+        return move
+
+    def close(self):
+        '''
+        This function closes the file of the book.
+        '''
+
+        self.data.close()
+
+
+def open_book(filename):
+    '''
+    This function opens an opening book once per process.
+
+    Parameters:
+        filename (str): file of the book, relative to the project folder, or None
+
+    Returns:
+        book (OpeningBook): the book, or None if there is no book file
+    '''
+
+    if filename is None:
+        return None
+
+    if not isabs(filename):
+        filename = join(path, filename)
+
+    if filename not in _books:
+        _books[filename] = OpeningBook(filename) if isfile(filename) else None
+
+    return _books[filename]
+
+
+def write_book(entries, filename):
+    '''
+    This function writes an opening book file.
+
+    Parameters:
+        entries (dict): canonical position hash -> (move, depth, score)
+        filename (str): file to write
+    '''
+
+    # Smallest power of two keeping the load under MAX_LOAD
+    slots = 1
+    while slots * MAX_LOAD < max(len(entries), 1):
+        slots <<= 1
+
+    mask = slots - 1
+    table = bytearray(HEADER.size + slots * SLOT.size)
+    HEADER.pack_into(table, 0, MAGIC, VERSION, slots)
+
+    used = [False] * slots
+
+    for key, (move, depth, score) in entries.items():
+        index = key & mask
+
+        while used[index]:
+            index = (index + 1) & mask
+
+        used[index] = True
+        SLOT.pack_into(table, HEADER.size + index * SLOT.size, key, move, min(depth, 255), score)
+
+    with open(filename, 'wb') as file:
+        file.write(table)
+
+
+def build_book(boards, plies, new_search, time_budget, max_depth=None):
+    '''
+    This function searches the opening positions of boards for a book.
+
+    Every position reachable in fewer than plies moves is searched the way
+    get_move sees it, with the player to move as player 1 (the players are
+    swapped at the plies of player 2), so the book covers both seats against
+    any opponent.
+
+    Parameters:
+        boards (list): list of (name, cards) tuples
+        plies (int): number of opening moves covered
+        new_search (function): function returning a new Search
+        time_budget (float): time per position in seconds
+        max_depth (int): maximum depth of the search, or None
+
+    Returns:
+        entries (dict): canonical position hash -> (move, depth, score)
+    '''
+
+    # Only building the book needs the game classes, the agents import book without them
+    from utils.classes import Player
+
+    entries = {}
+
+    def expand(state, ply):
+        if ply >= plies or state.is_game_over():
+            return
+
+        view = state if ply % 2 == 0 else state.get_swapped()
+        key, transform = view.get_canonical()
+
+        # Positions that are images of each other are searched once
+        if key not in entries:
+            move, score, depth = new_search().iterative_deepening(view, max_depth, time.time() + time_budget)
+            entries[key] = (SYMMETRIES[transform][move], depth, score)
+
+        # Player 1 moves at even plies, player 2 at odd plies
+        for next_move in state.get_moves():
+            undo = state.make_move(next_move, 1 + ply % 2)
+            expand(state, ply + 1)
+            state.unmake_move(undo)
+
+    for name, cards in boards:
+        expand(BoardState.from_cards(cards, Player('book'), Player('book')), 0)
+
+    return entries
+
+
+if __name__ == "__main__":
+    from benchmark import load_boards
+
+    parser = argparse.ArgumentParser(description="Builds the opening book of a minimax agent")
+    parser.add_argument('--agent', type=str, help="agent module whose search builds the book", default='minimax')
+    parser.add_argument('--boards', type=int, help="number of random boards when boards/ is empty", default=10)
+    parser.add_argument('--plies', type=int, help="number of opening moves covered", default=3)
+    parser.add_argument('--time', type=float, help="time budget per position in seconds", default=5.0)
+    parser.add_argument('--depth', type=int, help="maximum depth of the search", default=None)
+    parser.add_argument('--output', type=str, help="file of the book, book_<agent>.bin by default", default=None)
+    args = parser.parse_args()
+
+    output = args.output or f"book_{args.agent}.bin"
+
+    agent = importlib.import_module(args.agent)
+
+    def new_search():
+        return Search(agent.BANNER_WEIGHT, agent.CARD_WEIGHT, tt_size_mb=agent.TT_SIZE_MB, pvs=agent.PVS,
+                      aspiration_window=agent.ASPIRATION_WINDOW, lmr=agent.LMR, futility=agent.FUTILITY,
+                      proximity_weight=agent.PROXIMITY_WEIGHT)
+
+    start = time.time()
+    entries = build_book(load_boards(args.boards), args.plies, new_search, args.time, args.depth)
+    write_book(entries, join(path, output))
+
+    depths = [depth for move, depth, score in entries.values()]
+    print(f"{len(entries)} positions in {time.time() - start:.1f}s, "
+          f"average depth {sum(depths) / max(len(depths), 1):.2f}, written to {output}")
@@ -0,0 +1,159 @@
+'''
+Evaluation of positions as a weight vector against features.
+
+The evaluation of the agents is the product of the weight vector
+(BANNER_WEIGHT, CARD_WEIGHT, PROXIMITY_WEIGHT) with the features of a
+position, one per entry of FEATURES, from the point of view of player 1.
+With the proximity weight at 0, the scores are the ones of evaluate_state
+in the agents.
+
+The search scores the leaves below a node of depth 1 together:
+get_leaf_features works out the features of the position after each move
+from the position itself (the cards taken by the move and the banner of
+their house), so the moves are not made, and score_features scores all the
+rows against the weight vector.
+'''
+
+from bitboard import BETWEEN_MASKS, LINE_MASKS, NUM_HOUSES, OWNER_SIGNS, popcount
+
+# Features of a position, from the point of view of player 1
+FEATURES = ('banners', 'cards', 'proximity')
+
+HOUSE_RANGE = range(NUM_HOUSES)
+
+
+def get_weights(banner_weight, card_weight, proximity_weight=0.0):
+    '''
+    This function builds the weight vector of FEATURES.
+
+    Parameters:
+        banner_weight (float): weight of a banner
+        card_weight (float): weight of a card in hand
+        proximity_weight (float): weight of a card in reach of Varys of a house led in hand
+
+    Returns:
+        weights (tuple): weight of each entry of FEATURES
+    '''
+
+    return (banner_weight, card_weight, proximity_weight)
+
+
+def get_proximity(houses, hands, varys):
+    '''
+    This function computes the proximity feature of a position.
+
+    It is the number of cards in the row or column of Varys of the houses
+    player 1 leads in hand, minus those of the houses player 2 leads.
+
+    Parameters:
+        houses (list): bitboard of the cards of each house left on the board
+        hands (tuple): hand counts of player 1 and player 2 by house
+        varys (int): square of Varys
+
+    Returns:
+        proximity (int): the feature
+    '''
+
+    line = LINE_MASKS[varys]
+    hand1, hand2 = hands
+    proximity = 0
+
+    for house in HOUSE_RANGE:
+        lead = hand1[house] - hand2[house]
+
+        if lead:
+            reach = popcount(houses[house] & line)
+            proximity += reach if lead > 0 else -reach
+
+    return proximity
+
+
+def get_features(state, proximity=True):
+    '''
+    This function computes the features of a position.
+
+    Parameters:
+        state (BoardState): the position
+        proximity (bool): False to leave the proximity at 0, when its weight is 0
+
+    Returns:
+        features (tuple): value of each entry of FEATURES
+    '''
+
+    return (state.banner_diff, state.card_diff,
+            get_proximity(state.houses, state.hands, state.varys) if proximity else 0)
+
+
+def get_leaf_features(state, moves, player, proximity=True):
+    '''
+    This function computes the features of the positions after each move, without making the moves.
+
+    A move takes the selected card and the cards of its house between it
+    and Varys, and only the banner of that house can change hands, with the
+    rules of BoardState.make_move.
+
+    Parameters:
+        state (BoardState): the position
+        moves (list): moves of the player to move
+        player (int): player to move, 1 or 2
+        proximity (bool): False to leave the proximity at 0, when its weight is 0
+
+    Returns:
+        features (list): one tuple of FEATURES per move, in the order of moves
+    '''
+
+    varys_between = BETWEEN_MASKS[state.varys]
+    houses = state.houses
+    squares = state.squares
+    banners = state.banners
+    hands = state.hands
+    hand = hands[player - 1]
+    opponent_hand = hands[2 - player]
+
+    banner_diff = state.banner_diff
+    card_diff = state.card_diff
+    sign = 1 if player == 1 else -1
+
+    features = []
+
+    for move in moves:
+        house = squares[move]
+        captured = varys_between[move] & houses[house]
+        count = popcount(captured) + 1
+
+        owner = player if hand[house] + count >= opponent_hand[house] else 3 - player
+        leaf_banners = banner_diff + OWNER_SIGNS[owner] - OWNER_SIGNS[banners[house]]
+        leaf_cards = card_diff + sign * count
+
+        if proximity:
+            leaf_houses = houses[:]
+            leaf_houses[house] ^= captured | (1 << move)
+
+            leaf_hand = hand[:]
+            leaf_hand[house] += count
+            leaf_hands = (leaf_hand, opponent_hand) if player == 1 else (opponent_hand, leaf_hand)
+
+            features.append((leaf_banners, leaf_cards, get_proximity(leaf_houses, leaf_hands, move)))
+
+        else:
+            features.append((leaf_banners, leaf_cards, 0))
+
+    return features
+
+
+def score_features(features, weights):
+    '''
+    This function scores rows of features against the weight vector.
+
+    Parameters:
+        features (list): tuples of FEATURES, see get_features and get_leaf_features
+        weights (tuple): weight vector of FEATURES, see get_weights
+
+    Returns:
+        scores (list): score of each row, from the point of view of player 1
+    '''
+
+    banner_weight, card_weight, proximity_weight = weights
+
+    return [banners * banner_weight + cards * card_weight + proximity * proximity_weight
+            for banners, cards, proximity in features]
@@ -0,0 +1,390 @@
+'''
+Agents hosted in long-lived worker processes.
+
+main.py and main_tester.py ask an AgentProcess for each move instead of
+calling get_move in a thread. The worker imports the agent module once and
+keeps it between moves (so the search session, book and pools of the agent
+stay warm), and receives the position as a compact tuple rebuilt into
+Card and Player objects, so the harness makes no deep copy. When the
+deadline passes, the worker is killed with its own helper processes
+(pondering, pools) and a new one is started, so a runaway search cannot
+keep using CPU. A worker that dies, or does not load the agent within
+READY_TIMEOUT, is handled the same way: the move is out of time and the
+worker is started again.
+'''
+
+import atexit
+import importlib
+import inspect
+import multiprocessing
+import os
+import random
+import signal
+import threading
+import time
+import traceback
+
+from utils.classes import Card, Player
+
+# Seconds between two checks of a worker that the harness is still running
+WATCH_INTERVAL = 0.5
+
+# Seconds a worker has to import the agent
+READY_TIMEOUT = 30
+
+# Workers still running, closed at exit
+_processes = set()
+
+
+def get_compact_state(cards, player1, player2):
+    '''
+    This function packs a position into plain tuples.
+
+    Parameters:
+        cards (list): list of Card objects
+        player1 (Player): player 1
+        player2 (Player): player 2
+
+    Returns:
+        state (tuple): cards as (house, name, location) tuples and, for each
+            player, agent name, cards in the same form and banners by house
+    '''
+
+    def pack_player(player):
+        player_cards = tuple((card.get_house(), card.get_name(), card.get_location())
+                             for house_cards in player.get_cards().values() for card in house_cards)
+
+        return player.get_agent(), player_cards, tuple(player.get_banners().items())
+
+    return (tuple((card.get_house(), card.get_name(), card.get_location()) for card in cards),
+            pack_player(player1), pack_player(player2))
+
+
+def from_compact_state(state):
+    '''
+    This function rebuilds the objects of a position packed by get_compact_state.
+
+    Parameters:
+        state (tuple): packed position
+
+    Returns:
+        cards (list): list of Card objects
+        player1 (Player): player 1
+        player2 (Player): player 2
+    '''
+
+    cards_state, *players_state = state
+    players = []
+
+    for agent, player_cards, banners in players_state:
+        player = Player(agent)
+
+        for house, name, location in player_cards:
+            player.add_card(Card(house, name, location))
+
+        player.get_banners().update(banners)
+        players.append(player)
+
+    return [Card(*card) for card in cards_state], players[0], players[1]
+
+
+def _watch_harness(harness_pid):
+    '''
+    This function ends the worker and its helper processes once the harness is gone.
+
+    A worker leads its own process group, so it does not get the signals
+    that kill the harness, e.g. Ctrl+C or the timeout of a tournament.
+
+    Parameters:
+        harness_pid (int): process id of the harness
+    '''
+
+    while os.getppid() == harness_pid:
+        time.sleep(WATCH_INTERVAL)
+
+    if hasattr(os, 'killpg'):
+        os.killpg(0, signal.SIGKILL)
+
+    os._exit(1)
+
+
+def _agent_worker(conn, harness_pid, module_name, settings):
+    '''
+    This function runs an agent in a worker process.
+
+    The worker first answers ('ready',) or ('error', traceback). Commands are
+    then received on conn: ('move', state, turn) is answered with ('move',
+    move, time spent in get_move) or ('error', traceback), turn being passed
+    to the get_move of agents that take it; ('ponder', state, turn)
+    and ('stop_pondering',) call the functions of the agent if it has them
+    and are not answered; None ends the process.
+
+    Parameters:
+        conn (Connection): end of the pipe of the process
+        harness_pid (int): process id of the harness
+        module_name (str): module of the agent
+        settings (dict): module attributes set after the import, e.g. TIMEOUT
+    '''
+
+    # Lead a process group, so that the harness kills the helper processes of the agent too
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()
+
+    threading.Thread(target=_watch_harness, args=(harness_pid,), daemon=True).start()
+
+    # A forked worker starts with the random state of the harness, the same after each restart
+    random.seed()
+
+    try:
+        agent = importlib.import_module(module_name)
+
+        for name, value in settings.items():
+            setattr(agent, name, value)
+
+        # Agents that take the seat get it from the harness, the others work it out from the board
+        takes_turn = 'turn' in inspect.signature(agent.get_move).parameters
+
+    except Exception:
+        conn.send(('error', traceback.format_exc()))
+        return
+
+    conn.send(('ready',))
+
+    while True:
+        try:
+            command = conn.recv()
+
+        except EOFError:  # The harness has exited
+            command = None
+
+        if command is None:
+            if hasattr(agent, 'stop_pondering'):
+                agent.stop_pondering()
+
+            break
+
+        if command[0] == 'move':
+            start = time.perf_counter()
+
+            try:
+                if takes_turn and command[2] is not None:
+                    move = agent.get_move(*from_compact_state(command[1]), turn=command[2])
+
+                else:
+                    move = agent.get_move(*from_compact_state(command[1]))
+
+            except Exception:
+                conn.send(('error', traceback.format_exc()))
+                continue
+
+            conn.send(('move', move, time.perf_counter() - start))
+
+        elif command[0] == 'ponder' and hasattr(agent, 'ponder'):
+            agent.ponder(*from_compact_state(command[1]), command[2])
+
+        elif command[0] == 'stop_pondering' and hasattr(agent, 'stop_pondering'):
+            agent.stop_pondering()
+
+
+class AgentProcess:
+    '''
+    An agent module hosted in a worker process, restarted after a timeout.
+
+    moves and timeouts count the requests (the worker is restarted after
+    each timeout, and a worker that died or did not load counts as one),
+    and overhead sums the time of get_move spent outside the get_move of
+    the agent (packing, pipe, unpacking).
+    '''
+
+    def __init__(self, module_name, settings=None):
+        self.module_name = module_name
+        self.settings = settings or {}
+
+        self.process = None
+        self.conn = None
+        self.ready = False
+
+        self.moves = 0
+        self.timeouts = 0
+        self.overhead = 0.0
+
+        self.start()
+
+    def start(self):
+        '''
+        This function starts the worker process, which imports the agent in the background.
+        '''
+
+        self.conn, child_conn = multiprocessing.Pipe()
+
+        # Not a daemon, so that the agent can start its own processes
+        self.process = multiprocessing.Process(target=_agent_worker,
+                                               args=(child_conn, os.getpid(), self.module_name, self.settings))
+        self.process.start()
+        child_conn.close()
+
+        self.ready = False
+        _processes.add(self)
+
+    def kill(self):
+        '''
+        This function kills the worker process and its helper processes.
+        '''
+
+        if hasattr(os, 'killpg'):
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+
+            except (ProcessLookupError, PermissionError):  # The worker has not set up its group yet
+                pass
+
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+        _processes.discard(self)
+
+    def restart(self):
+        '''
+        This function kills the worker process and starts a new one.
+        '''
+
+        self.kill()
+        self.start()
+
+    def wait_ready(self):
+        '''
+        This function waits until the worker has imported the agent.
+
+        A worker that exits or does not answer within READY_TIMEOUT is restarted.
+
+        Returns:
+            ready (bool): True if the agent is loaded, False if the worker was restarted
+        '''
+
+        if self.ready:
+            return True
+
+        try:
+            reply = self.conn.recv() if self.conn.poll(READY_TIMEOUT) else None
+
+        except (EOFError, OSError):  # The worker has died
+            reply = None
+
+        if reply is None:
+            self.restart()
+            return False
+
+        if reply[0] == 'error':
+            raise ImportError(f"Could not load the agent {self.module_name}:\n{reply[1]}")
+
+        self.ready = True
+
+        return True
+
+    def get_move(self, cards, player1, player2, timeout, turn=None):
+        '''
+        This function gets the move of the agent within a time limit.
+
+        Parameters:
+            cards (list): list of Card objects
+            player1 (Player): player 1
+            player2 (Player): player 2
+            timeout (float): time limit in seconds
+            turn (int): player to move, 1 or 2, or None if the caller does not know it
+
+        Returns:
+            move (int): location of the card, or None if the agent ran out of
+                time, its worker died or did not load
+        '''
+
+        self.moves += 1
+
+        if not self.wait_ready():
+            self.timeouts += 1
+            return None
+
+        start = time.perf_counter()
+
+        try:
+            self.conn.send(('move', get_compact_state(cards, player1, player2), turn))
+            reply = self.conn.recv() if self.conn.poll(timeout) else None
+
+        except (EOFError, OSError):  # The worker has died
+            reply = None
+
+        if reply is None:
+            self.timeouts += 1
+            self.restart()
+
+            return None
+
+        if reply[0] == 'error':
+            raise RuntimeError(f"The agent {self.module_name} failed:\n{reply[1]}")
+
+        self.overhead += time.perf_counter() - start - reply[2]
+
+        return reply[1]
+
+    def ponder(self, cards, player1, player2, turn):
+        '''
+        This function lets the agent search during the turn of the opponent, if it can.
+
+        Parameters:
+            cards (list): list of Card objects
+            player1 (Player): player 1
+            player2 (Player): player 2
+            turn (int): player to move, the opponent of the agent
+        '''
+
+        if self.wait_ready():
+            self.send(('ponder', get_compact_state(cards, player1, player2), turn))
+
+    def stop_pondering(self):
+        '''
+        This function stops the pondering of the agent, if it ponders.
+        '''
+
+        if self.wait_ready():
+            self.send(('stop_pondering',))
+
+    def send(self, command):
+        '''
+        This function sends a command that is not answered to the worker.
+
+        Parameters:
+            command (tuple): the command, see _agent_worker
+        '''
+
+        try:
+            self.conn.send(command)
+
+        except OSError:  # The worker has died, the next get_move restarts it
+            pass
+
+    def close(self):
+        '''
+        This function ends the worker process.
+        '''
+
+        if self not in _processes:
+            return
+
+        try:
+            self.conn.send(None)
+            self.process.join(1)
+
+        except (BrokenPipeError, OSError):
+            pass
+
+        if self.process.is_alive():
+            self.kill()
+
+        self.conn.close()
+        _processes.discard(self)
+
+
+@atexit.register
+def _close_processes():
+    # Runs before the exit handler of multiprocessing, which would wait for the workers
+    for process in list(_processes):
+        process.close()
@@ -0,0 +1,373 @@
+'''
+Monte Carlo Tree Search agent.
+
+UCT on the bitboard representation: each iteration walks down the tree with
+UCB1 plus an optional progressive bias from the evaluation of the minimax
+agents, expands a leaf and plays a batch of random games from it to the end.
+The search is anytime: it stops at the deadline and plays the most visited
+move. With WORKERS above 1, independent trees are grown in a pool of
+processes and their root visits are added up (root parallelism).
+
+As for the minimax agents, the search runs on the position seen by the
+player to move (see search.get_state_to_move), so the agent plays for its
+own seat.
+'''
+
+import math
+import multiprocessing
+import random
+import time
+
+from bitboard import BoardState, BETWEEN_MASKS, LINE_MASKS, SQUARE_BITS, popcount, squares_of
+from search import get_state_to_move
+
+TIMEOUT = 10  # Matches main.py
+TIME_MARGIN = 0.5  # Time left to main.try_get_move around the search
+EXPLORATION = 1.4  # Exploration constant of UCB1
+ROLLOUT_BATCH = 4  # Random games played from each new leaf
+WORKERS = 1  # Processes growing independent trees, 1 for a single tree
+PRIORS = True  # Progressive bias from the evaluation of the minimax agents
+
+# Helper weights for the priors, as in minimax.py
+BANNER_WEIGHT = 10
+CARD_WEIGHT = 1
+PRIOR_WEIGHT = 1.0  # Weight of the prior of a move, divided by its visits + 1
+PRIOR_SCALE = 10  # Evaluation gain that gives a prior of about 0.73
+
+# The deadline is checked every CHECK_INTERVAL + 1 iterations (must be a power of two minus one)
+CHECK_INTERVAL = 15
+
+# Statistics of the last get_move: iterations, rollouts, rollouts per second
+last_stats = {}
+
+# Pools by number of workers, kept between get_move calls
+_pools = {}
+
+
+class Node:
+    '''
+    Node of the search tree.
+
+    wins counts the rollouts won by the player who made the move leading to
+    the node, so a parent picks the child with the best wins / visits.
+    '''
+
+    __slots__ = ('move', 'player', 'children', 'visits', 'wins', 'prior')
+
+    def __init__(self, move, player, prior):
+        self.move = move
+        self.player = player  # Player who made the move leading to the node
+        self.children = None  # Created on the first visit
+        self.visits = 0
+        self.wins = 0.0
+        self.prior = prior
+
+
+def get_priors(state, player):
+    '''
+    This function gives a prior in (0, 1) to each move of a position.
+
+    The prior grows with the gain of evaluation of the move for the player,
+    banners and cards in hand weighted as in the minimax agents.
+
+    Parameters:
+        state (BoardState): the position
+        player (int): player to move, 1 or 2
+
+    Returns:
+        priors (list): (move, prior) tuples
+    '''
+
+    sign = 1 if player == 1 else -1
+    before = state.banner_diff * BANNER_WEIGHT + state.card_diff * CARD_WEIGHT
+    priors = []
+
+    for move in squares_of(state.get_moves_mask()):
+        undo = state.make_move(move, player)
+        gain = sign * (state.banner_diff * BANNER_WEIGHT + state.card_diff * CARD_WEIGHT - before)
+        state.unmake_move(undo)
+
+        priors.append((move, 1 / (1 + math.exp(-gain / PRIOR_SCALE))))
+
+    return priors
+
+
+def expand(node, state, priors):
+    '''
+    This function creates the children of a node.
+
+    Parameters:
+        node (Node): the node, whose position is state
+        state (BoardState): the position
+        priors (bool): True to give the children priors from get_priors
+    '''
+
+    player = 3 - node.player
+
+    if priors:
+        moves = get_priors(state, player)
+
+        # Visit the moves with the best priors first
+        moves.sort(key=lambda item: item[1], reverse=True)
+
+    else:
+        moves = [(move, 0.0) for move in squares_of(state.get_moves_mask())]
+
+    node.children = [Node(move, player, prior) for move, prior in moves]
+
+
+def select_child(node):
+    '''
+    This function picks the child to visit with UCB1 and the progressive bias.
+
+    Parameters:
+        node (Node): the node, with children
+
+    Returns:
+        child (Node): the child to visit
+    '''
+
+    log_visits = math.log(max(node.visits, 1))
+    best_child = None
+    best_score = -float('inf')
+
+    for child in node.children:
+        if child.visits == 0:
+            return child
+
+        score = (child.wins / child.visits + EXPLORATION * math.sqrt(log_visits / child.visits)
+                 + PRIOR_WEIGHT * child.prior / (child.visits + 1))
+
+        if score > best_score:
+            best_score = score
+            best_child = child
+
+    return best_child
+
+
+def play_rollouts(state, player, count, rng):
+    '''
+    This function plays a batch of random games from a position to the end.
+
+    The games run on plain copies of the masks, hands and banners of the
+    state, without the hashes and the decided banners that BoardState keeps
+    up to date for the search: a move only needs the house of the selected
+    square, the cards taken with it and the banner of that house (the rules
+    of BoardState.make_move). The houses of the squares are never changed,
+    since only occupied squares are selected.
+
+    Parameters:
+        state (BoardState): the position, not changed
+        player (int): player to move, 1 or 2
+        count (int): number of games
+        rng (Random): random generator
+
+    Returns:
+        wins (list): games with no banner held, games won by player 1, games won by player 2
+    '''
+
+    squares = state.squares
+    wins = [0, 0, 0]
+
+    for _ in range(count):
+        houses = state.houses[:]
+        hands = (state.hands[0][:], state.hands[1][:])
+        banners = state.banners[:]
+        occupied = state.occupied
+        varys = state.varys
+        mover = player
+
+        mask = LINE_MASKS[varys] & occupied if varys is not None else 0
+
+        while mask:
+            # Pick the n-th set bit of the mask
+            index = rng.randrange(popcount(mask))
+            while index:
+                mask &= mask - 1
+                index -= 1
+
+            move = (mask & -mask).bit_length() - 1
+            house = squares[move]
+            captured = (BETWEEN_MASKS[varys][move] & houses[house]) | SQUARE_BITS[move]
+
+            houses[house] ^= captured
+            occupied ^= captured
+
+            hand = hands[mover - 1]
+            hand[house] += popcount(captured)
+            banners[house] = mover if hand[house] >= hands[2 - mover][house] else 3 - mover
+
+            varys = move
+            mover = 3 - mover
+            mask = LINE_MASKS[varys] & occupied
+
+        # The winner with the rules of calculate_winner, see BoardState.get_winner
+        diff = banners.count(1) - banners.count(2)
+
+        if diff:
+            wins[1 if diff > 0 else 2] += 1
+
+        else:
+            wins[next((owner for owner in banners if owner), 0)] += 1
+
+    return wins
+
+
+def grow_tree(state, deadline, seed, priors, batch):
+    '''
+    This function runs the search from a position, player 1 to move, until the deadline.
+
+    Parameters:
+        state (BoardState): the root position
+        deadline (float): time.time() at which the search stops
+        seed (int): seed of the random generator of the rollouts
+        priors (bool): True to use the progressive bias
+        batch (int): random games played from each new leaf
+
+    Returns:
+        visits (dict): move -> visits of the root children
+        iterations (int): number of iterations
+        rollouts (int): number of random games
+    '''
+
+    rng = random.Random(seed)
+    root = Node(None, 2, 0.0)
+    state = state.copy()
+    expand(root, state, priors)
+
+    iterations = 0
+    rollouts = 0
+
+    while True:
+        if not iterations & CHECK_INTERVAL and time.time() > deadline:
+            break
+
+        iterations += 1
+
+        # Selection, taking the moves on the state and back afterwards
+        node = root
+        path = [root]
+        undos = []
+
+        while node.children:
+            node = select_child(node)
+            undos.append(state.make_move(node.move, node.player))
+            path.append(node)
+
+            if node.visits == 0:
+                break
+
+        # Expansion of a node visited before, unless the game is over
+        if node.children is None and node.visits > 0 and state.get_moves_mask():
+            expand(node, state, priors)
+
+            node = node.children[0]
+            undos.append(state.make_move(node.move, node.player))
+            path.append(node)
+
+        # Simulation: a batch of random games from the leaf
+        wins = play_rollouts(state, 3 - node.player, batch, rng)
+        rollouts += batch
+
+        # Backpropagation: each node counts the wins of the player who moved into it
+        for visited in path:
+            visited.visits += batch
+            visited.wins += wins[visited.player]
+
+        for undo in reversed(undos):
+            state.unmake_move(undo)
+
+    visits = {child.move: child.visits for child in root.children}
+
+    return visits, iterations, rollouts
+
+
+def _grow_tree_task(task):
+    '''
+    This function grows a tree in a worker process.
+
+    Parameters:
+        task (tuple): state arguments, deadline, seed, priors and batch
+
+    Returns:
+        result (tuple): result of grow_tree
+    '''
+
+    state_args, deadline, seed, priors, batch = task
+
+    return grow_tree(BoardState(*state_args), deadline, seed, priors, batch)
+
+
+def get_pool(workers):
+    '''
+    This function gets the pool of worker processes, started on first use.
+
+    Parameters:
+        workers (int): number of processes
+
+    Returns:
+        pool (Pool): the pool
+    '''
+
+    if workers not in _pools:
+        _pools[workers] = multiprocessing.Pool(workers)
+
+    return _pools[workers]
+
+
+def find_move(state, deadline, workers, priors, batch, seed=None):
+    '''
+    This function finds the best move for player 1 by growing one tree per worker.
+
+    Parameters:
+        state (BoardState): the position, with at least one move
+        deadline (float): time.time() at which the search stops
+        workers (int): number of trees, grown in a pool of processes above 1
+        priors (bool): True to use the progressive bias
+        batch (int): random games played from each new leaf
+        seed (int): seed of the random generators, or None for a random one
+
+    Returns:
+        best_move (int): location of the card
+        iterations (int): number of iterations of all the trees
+        rollouts (int): number of random games of all the trees
+    '''
+
+    if seed is None:
+        seed = random.getrandbits(32)
+
+    if workers > 1:
+        state_args = (state.houses, state.squares, state.varys, state.hands, state.banners)
+        tasks = [(state_args, deadline, seed + worker, priors, batch) for worker in range(workers)]
+        results = get_pool(workers).map(_grow_tree_task, tasks)
+
+    else:
+        results = [grow_tree(state, deadline, seed, priors, batch)]
+
+    # Add up the root visits of the trees
+    visits = {}
+    for tree_visits, iterations, rollouts in results:
+        for move, count in tree_visits.items():
+            visits[move] = visits.get(move, 0) + count
+
+    best_move = max(state.get_moves(), key=lambda move: visits.get(move, 0))
+
+    return best_move, sum(result[1] for result in results), sum(result[2] for result in results)
+
+
+def get_move(cards, player1, player2, turn=None):
+    start = time.time()
+
+    # turn is the seat of the agent, given by the harness (guessed from the board if None)
+    state = get_state_to_move(cards, player1, player2, turn)
+
+    moves = state.get_moves()
+    if len(moves) < 2:
+        return moves[0] if moves else None
+
+    move, iterations, rollouts = find_move(state, start + TIMEOUT - TIME_MARGIN, WORKERS, PRIORS, ROLLOUT_BATCH)
+
+    last_stats.update(iterations=iterations, rollouts=rollouts,
+                      rollouts_per_second=rollouts / max(time.time() - start, 1e-9))
+
+    return move
@@ -1,34 +1,65 @@
-import random
-import time
 import copy
 
+import book
+import pondering
+import search
+from bitboard import BoardState
+from rules import get_possible_moves, make_move, is_game_over
 
-DEPTH = 5 
-TIMEOUT = 10  # Matches main.py
-
-def get_move(cards, player1, player2):
-    start_time = time.time()
-    valid_moves = get_possible_moves(cards)
-
-    if not valid_moves:
-        return None
-
-    best_move = None
-    best_score = -float('inf')
-
-    for move in valid_moves:
-        if time.time() - start_time > TIMEOUT:
-            break
-
-        new_cards, new_player1, new_player2 = simulate_move(cards, player1, player2, move, True)
-        score = minimax(new_cards, new_player1, new_player2, DEPTH - 1, False, -float('inf'), float('inf'))
-
-        if score > best_score:
-            best_score = score
-            best_move = move
-
-    return best_move
 
+DEPTH = None  # Maximum depth of lookahead, None deepens until the time runs out
+TIMEOUT = 10  # Matches main.py
+TIME_MARGIN = 0.5  # Time left to main.try_get_move around the search
+TT_SIZE_MB = 64  # Memory cap of the transposition table and the solved endgames
+WORKERS = 1  # Processes searching the root moves, 1 for a single-process search
+PVS = True  # Principal variation search, False for plain alpha-beta
+LMR = True  # Late move reductions of quiet moves
+FUTILITY = True  # Futility pruning near the leaves
+ENDGAME_CARDS = 18  # Solve the game exactly from this many cards left on the board
+SYMMETRY = False  # Share the search caches between rotations and reflections of a position
+BOOK_FILE = 'book_minimax2.bin'  # Opening book built with book.py --agent minimax2, None to disable
+PONDER_HIT_DEPTH = 8  # Pondered moves searched this deep are played without searching
+SESSION = True  # Keep the search between the moves of a game
+
+# Helper weights for evaluation
+BANNER_WEIGHT = 1
+CARD_WEIGHT = 0.1
+PROXIMITY_WEIGHT = 0  # Weight of the cards in reach of Varys of the houses led in hand, see evaluation.py
+
+ASPIRATION_WINDOW = BANNER_WEIGHT  # Half-width of the aspiration windows, None to disable
+
+_ponderer = None  # Pondering process, started by the first call to ponder
+_session = search.Session()
+
+
+def get_search_options():
+    return dict(tt_size_mb=TT_SIZE_MB, pvs=PVS, aspiration_window=ASPIRATION_WINDOW, lmr=LMR, futility=FUTILITY,
+                endgame_cards=ENDGAME_CARDS, symmetry=SYMMETRY, proximity_weight=PROXIMITY_WEIGHT)
+
+def get_move(cards, player1, player2, turn=None):
+    # turn is the seat of the agent, given by the harness (guessed from the board if None)
+    return search.get_move(cards, player1, player2, DEPTH, BANNER_WEIGHT, CARD_WEIGHT, TIMEOUT - TIME_MARGIN,
+                           book=book.open_book(BOOK_FILE), workers=WORKERS, ponderer=_ponderer,
+                           session=_session if SESSION else None, turn=turn, **get_search_options())
+
+def ponder(cards, player1, player2, turn):
+    # Search the replies of the opponent (player turn) until the next get_move
+    global _ponderer
+    if _ponderer is None:
+        _ponderer = pondering.Ponderer(BANNER_WEIGHT, CARD_WEIGHT, PONDER_HIT_DEPTH, **get_search_options())
+    # Ponder on the position seen by the agent, in which the opponent is player 2
+    state = BoardState.from_cards(cards, player1, player2)
+    if turn == 1:
+        state = state.get_swapped()
+    _ponderer.ponder(search.get_game_id(cards, player1, player2), state, 2)
+
+def stop_pondering():
+    global _ponderer
+    if _ponderer is not None:
+        _ponderer.close()
+        _ponderer = None
+
+# List-based search below is kept as the reference implementation for benchmark.py
 def minimax(cards, player1, player2, depth, maximizing_player, alpha, beta):
     if depth == 0 or is_game_over(cards):
         return evaluate_state(cards, player1, player2)
@@ -58,27 +89,9 @@ def minimax(cards, player1, player2, depth, maximizing_player, alpha, beta):
                 break
         return min_eval
 
-def get_possible_moves(cards):
-    varys_location = find_varys(cards)
-    if varys_location is None:
-        return []
-
-    varys_row, varys_col = varys_location // 6, varys_location % 6
-    moves = []
-
-    for card in cards:
-        if card.get_name() == 'Varys':
-            continue
-
-        row, col = card.get_location() // 6, card.get_location() % 6
-        if row == varys_row or col == varys_col:
-            moves.append(card.get_location())
-
-    return moves
-
 def evaluate_state(cards, player1, player2):
-    player1_banners = sum(player1.get_banners().values())
-    player2_banners = sum(player2.get_banners().values())
+    player1_banners = sum(player1.get_banners().values()) * BANNER_WEIGHT
+    player2_banners = sum(player2.get_banners().values()) * BANNER_WEIGHT
 
     player1_control = evaluate_player_control(player1)
     player2_control = evaluate_player_control(player2)
@@ -86,7 +99,7 @@ def evaluate_state(cards, player1, player2):
     return (player1_banners + player1_control) - (player2_banners + player2_control)
 
 def evaluate_player_control(player):
-    return get_cards_in_hand(player) * 0.1
+    return get_cards_in_hand(player) * CARD_WEIGHT
 
 def simulate_move(cards, player1, player2, move, maximizing_player):
     new_cards = copy.deepcopy(cards)
@@ -100,59 +113,5 @@ def simulate_move(cards, player1, player2, move, maximizing_player):
 
     return new_cards, new_player1, new_player2
 
-def make_move(cards, move, player):
-    varys_location = find_varys(cards)
-    if varys_location is None:
-        return None
-
-    varys_row, varys_col = varys_location // 6, varys_location % 6
-    move_row, move_col = move // 6, move % 6
-
-    selected_card = find_card(cards, move)
-    removing_cards = []
-
-    for i, card in enumerate(cards):
-        if card.get_name() == 'Varys':
-            varys_index = i
-            continue
-
-        if card.get_location() == move:
-            continue
-
-        row, col = card.get_location() // 6, card.get_location() % 6
-
-        if (row == varys_row and varys_col < col < move_col) or \
-            (row == varys_row and move_col < col < varys_col) or \
-            (col == varys_col and varys_row < row < move_row) or \
-            (col == varys_col and move_row < row < varys_row):
-
-            if card.get_house() == selected_card.get_house():
-                removing_cards.append(card)
-                player.add_card(card)
-
-    player.add_card(selected_card)
-    cards[varys_index].set_location(move)
-
-    for card in removing_cards:
-        cards.remove(card)
-
-    cards.remove(selected_card)
-    return selected_card.get_house()
-
-def find_varys(cards):
-    for card in cards:
-        if card.get_name() == 'Varys':
-            return card.get_location()
-    return None
-
-def find_card(cards, location):
-    for card in cards:
-        if card.get_location() == location:
-            return card
-    return None
-
 def get_cards_in_hand(player):
-    return sum(len(cards) for cards in player.get_cards().values())
-
-def is_game_over(cards):
-    return len(get_possible_moves(cards)) == 0
+    return player.get_card_count()
@@ -0,0 +1,276 @@
+'''
+Multi-process root-splitting search for the minimax agents.
+
+Each iteration of the iterative deepening searches the first root move in the
+main process, which gives the bound for the other moves (young brothers
+wait), then splits the other root moves across a pool of worker processes.
+Workers publish the best score found so far in a shared value, so each move
+is searched with the best bound known when it starts. The value is tagged
+with the id of the search it belongs to, so the tasks still in the pool when
+a search stops cannot change the bound of the next one. They are dropped, and
+waited for when the pool is used again, after the move has been returned.
+
+The main process searches the first move of every iteration, which is the
+best move of the previous one, so its transposition table keeps the
+principal variation. Each worker keeps its own Search for the whole get_move.
+'''
+
+import itertools
+import multiprocessing
+import time
+
+from bitboard import BoardState, popcount
+from search import Search, SearchTimeout
+
+# Extra time the main process waits for the workers after the deadline
+RESULT_MARGIN = 0.05
+
+# Time the next search waits for the dropped tasks of a search before ending the pool
+DRAIN_TIMEOUT = 1.0
+
+# Set in each worker process by _init_worker
+_best_score = None
+_search = None
+_search_id = None
+_options = None
+
+# Pools by number of workers, kept between get_move calls
+_pools = {}
+
+# Results of the dropped tasks of the last search of a pool and their number, by pool
+_dropped = {}
+_search_ids = itertools.count()
+
+
+def _init_worker(best_score, options):
+    '''
+    This function sets up a worker process.
+
+    Parameters:
+        best_score (Array): id of the running search and best root score of its
+            iteration, shared by the workers
+        options (tuple): banner_weight, card_weight and keyword arguments of Search
+    '''
+
+    global _best_score, _options
+
+    _best_score = best_score
+    _options = options
+
+
+def _search_root_move(task):
+    '''
+    This function searches one root move in a worker process.
+
+    Parameters:
+        task (tuple): search id, state arguments, move, depth, alpha and deadline
+
+    Returns:
+        result (tuple): move, score (None if the deadline passed), alpha used
+            for the search and number of nodes
+    '''
+
+    global _search, _search_id
+
+    search_id, state_args, move, depth, alpha, deadline = task
+
+    # Tasks still queued when the search stopped are dropped
+    if time.time() >= deadline:
+        return move, None, alpha, 0
+
+    # Keep the Search, and its transposition table, for the whole get_move
+    if search_id != _search_id:
+        banner_weight, card_weight, options = _options
+        _search = Search(banner_weight, card_weight, **options)
+        _search_id = search_id
+
+    _search.deadline = deadline
+    _search.root_depth = depth
+    nodes = _search.nodes
+
+    with _best_score.get_lock():
+        if _best_score[0] == search_id:
+            alpha = max(alpha, _best_score[1])
+
+    state = BoardState(*state_args)
+
+    try:
+        # Null window search of a later move, searched again if it is better
+        score = _search.search_move(state, move, 1, depth, alpha, float('inf'), 1, False)
+
+    except SearchTimeout:
+        return move, None, alpha, _search.nodes - nodes
+
+    with _best_score.get_lock():
+        if _best_score[0] == search_id and score > _best_score[1]:
+            _best_score[1] = score
+
+    return move, score, alpha, _search.nodes - nodes
+
+
+class ParallelSearch:
+    '''
+    Iterative deepening over a pool of worker processes, with the interface of Search.
+
+    Positions that Search plays without a full search (decided winner,
+    endgame solver) are left to a Search in the main process.
+    '''
+
+    def __init__(self, banner_weight, card_weight, workers, **options):
+        self.workers = workers
+        self.options = (banner_weight, card_weight, options)
+        self.key = (workers, repr(self.options))
+        self.search = Search(banner_weight, card_weight, **options)
+
+        self.nodes = 0
+        self.worker_nodes = 0
+
+    def get_pool(self, deadline=float('inf')):
+        '''
+        This function gets the pool of worker processes, started on first use.
+
+        The tasks dropped by the last search of the pool are waited for first,
+        see drain.
+
+        Parameters:
+            deadline (float): time.time() at which the search of the caller stops
+
+        Returns:
+            pool (Pool): the pool
+            best_score (Array): shared search id and best root score of the pool
+        '''
+
+        if self.key in _dropped:
+            self.drain(*_dropped.pop(self.key), deadline)
+
+        if self.key not in _pools:
+            best_score = multiprocessing.Array('d', [-1, -float('inf')])
+            pool = multiprocessing.Pool(self.workers, initializer=_init_worker, initargs=(best_score, self.options))
+            _pools[self.key] = (pool, best_score)
+
+        return _pools[self.key]
+
+    def drain(self, results, count, deadline):
+        '''
+        This function waits for the tasks dropped by the last search of the pool.
+
+        The tasks return at once after the deadline of their search, so they
+        are usually all back by the next search. If they are not back within
+        DRAIN_TIMEOUT, or by the deadline of the new search, the pool is ended
+        and a new one is started.
+
+        Parameters:
+            results (IMapUnorderedIterator): results of the tasks of the stopped iteration
+            count (int): number of results not read yet
+            deadline (float): time.time() at which the new search stops
+        '''
+
+        stop = min(time.time() + DRAIN_TIMEOUT, deadline)
+
+        for _ in range(count):
+            try:
+                results.next(max(stop - time.time(), 0))
+
+            except multiprocessing.TimeoutError:
+                pool = _pools.pop(self.key)[0]
+                pool.terminate()
+                pool.join()
+                return
+
+    def iterative_deepening(self, state, max_depth, deadline):
+        '''
+        This function finds the best move for player 1 with iterative deepening.
+
+        Parameters:
+            state (BoardState): the position
+            max_depth (int): maximum depth, or None to deepen until the deadline
+            deadline (float): time.time() at which the search stops
+
+        Returns:
+            best_move (int): location of the card, or None if there are no moves
+            best_score (float): score of the best move
+            depth (int): depth of the last completed iteration
+        '''
+
+        search = self.search
+
+        if (state.is_outcome_decided() or popcount(state.occupied) <= search.endgame_cards
+                or len(state.get_moves()) < 2):
+            result = search.iterative_deepening(state, max_depth, deadline)
+            self.nodes = search.nodes
+
+            return result
+
+        search.start_search(state, deadline)
+        root_moves = search.order_moves(state, state.get_moves_mask(), 1, None, 0)
+
+        pool, best_score = self.get_pool(deadline)
+        search_id = next(_search_ids)
+        state_args = (state.houses, state.squares, state.varys, state.hands, state.banners)
+
+        best_move, best, completed_depth = root_moves[0], None, 0
+
+        last_depth = popcount(state.occupied)
+        if max_depth is not None:
+            last_depth = min(last_depth, max_depth)
+
+        root = search.new_root(state)
+
+        for depth in range(1, last_depth + 1):
+            search.root_depth = depth
+
+            try:
+                # The first move gives the bound of the others
+                first_score = search.search_move(root, root_moves[0], 1, depth, -float('inf'), float('inf'), 0, False)
+
+            except SearchTimeout:
+                break
+
+            with best_score.get_lock():
+                best_score[0] = search_id
+                best_score[1] = first_score
+
+            tasks = [(search_id, state_args, move, depth, first_score, deadline) for move in root_moves[1:]]
+            scores = {root_moves[0]: first_score}
+            complete = True
+
+            results = pool.imap_unordered(_search_root_move, tasks)
+            received = 0
+
+            for _ in tasks:
+                timeout = None if deadline == float('inf') else max(deadline - time.time(), 0) + RESULT_MARGIN
+
+                try:
+                    move, score, alpha, nodes = results.next(timeout)
+
+                except multiprocessing.TimeoutError:
+                    complete = False
+                    break
+
+                received += 1
+                self.worker_nodes += nodes
+
+                if score is None:
+                    complete = False
+
+                # Moves that fail low only have an upper bound at or below the best score
+                elif score > alpha:
+                    scores[move] = score
+
+            if not complete:
+                # Waited for by the next search of the pool, so the move is not delayed
+                if received < len(tasks):
+                    _dropped[self.key] = (results, len(tasks) - received)
+
+                break
+
+            move = max(scores, key=lambda root_move: (scores[root_move], -root_moves.index(root_move)))
+            best_move, best, completed_depth = move, scores[move], depth
+
+            # Search the best move first in the next iteration
+            root_moves.remove(move)
+            root_moves.insert(0, move)
+
+        self.nodes = search.nodes + self.worker_nodes
+
+        return best_move, best, completed_depth
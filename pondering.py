@@ -0,0 +1,237 @@
+'''
+Pondering for the minimax agents: searching during the opponent's turn.
+
+A Ponderer owns a background process with its own Search, kept between the
+moves of a game. While the opponent thinks, the process deepens the
+positions after each reply of the opponent, the predicted one (first in move
+order) first at every depth. When the real position arrives, get_move plays
+the pondered move at once if it was searched deep enough, and otherwise
+searches on with the transposition table filled by the pondering.
+
+The search runs in a process rather than a thread so that it does not take
+the interpreter lock from the game loop or from the other agent.
+'''
+
+import multiprocessing
+
+from bitboard import BoardState, popcount
+from search import Session, SearchTimeout
+
+
+def _state_args(state):
+    '''
+    This function gets the arguments to rebuild a state in another process.
+
+    Parameters:
+        state (BoardState): the position
+
+    Returns:
+        args (tuple): arguments of BoardState
+    '''
+
+    return state.houses, state.squares, state.varys, state.hands, state.banners
+
+
+def _ponder(search, state, player, pondered):
+    '''
+    This function searches the positions after the replies of the opponent until stopped.
+
+    Parameters:
+        search (Search): search of the pondering process, with the stop event set up
+        state (BoardState): position with the opponent to move
+        player (int): player of the opponent, 1 or 2
+        pondered (dict): position hash -> (move, depth, complete), filled in place
+    '''
+
+    search.start_search(state, float('inf'))
+
+    replies = search.order_moves(state, state.get_moves_mask(), player, None, 0)
+    positions = []
+
+    for reply in replies:
+        position = state.copy()
+        position.make_move(reply, player)
+
+        if position.get_moves_mask():
+            positions.append((position, search.order_moves(position, position.get_moves_mask(), 1, None, 0)))
+
+    depth = 0
+    searched = True
+
+    # Deepen until every position is searched to the end
+    while searched:
+        depth += 1
+        searched = False
+
+        for position, root_moves in positions:
+            move, completed_depth, complete = pondered.get(position.hash, (None, 0, False))
+
+            if complete or completed_depth >= depth:
+                continue
+
+            cards_left = popcount(position.occupied)
+            root = search.new_root(position)
+
+            # Positions the agent plays without a full search are done at once
+            if cards_left <= search.endgame_cards:
+                move = search.solve_root(root, root_moves)[0]
+                pondered[position.hash] = (move, cards_left, True)
+
+            elif position.is_outcome_decided():
+                pondered[position.hash] = (root_moves[0], cards_left, True)
+
+            else:
+                search.root_depth = depth
+                move = search.search_root(root, depth, root_moves)[0]
+                pondered[position.hash] = (move, depth, depth >= cards_left)
+
+                root_moves.remove(move)
+                root_moves.insert(0, move)
+
+            searched = True
+
+
+def _ponder_worker(conn, stop, banner_weight, card_weight, hit_depth, options):
+    '''
+    This function runs the pondering process.
+
+    Commands are received on conn: ('ponder', game id, state args, player)
+    starts pondering until the stop event is set, and is answered with the
+    number of positions pondered; ('move', game id, state args, max_depth,
+    deadline) is answered with (move, depth, hit); None ends the process.
+    The Search is kept between commands of the same game by a Session.
+
+    Parameters:
+        conn (Connection): end of the pipe of the process
+        stop (Event): event set by the agent to stop the pondering
+        banner_weight (float): weight of a banner in the evaluation
+        card_weight (float): weight of a card in hand in the evaluation
+        hit_depth (int): depth from which a pondered move is played without searching
+        options (dict): keyword arguments of Search
+    '''
+
+    session = Session()
+    pondered = {}
+
+    while True:
+        command = conn.recv()
+
+        if command is None:
+            break
+
+        if command[0] == 'ponder':
+            game_id, state_args, player = command[1:]
+            state = BoardState(*state_args)
+            pondered = {}
+
+            search = session.get_search(game_id, state, banner_weight, card_weight, **options)
+            search.stop = stop
+
+            try:
+                _ponder(search, state, player, pondered)
+
+            except SearchTimeout:
+                pass
+
+            # Answer only once the agent asks for the move
+            stop.wait()
+            conn.send(len(pondered))
+
+        else:
+            game_id, state_args, max_depth, deadline = command[1:]
+            state = BoardState(*state_args)
+
+            move, depth, complete = pondered.get(state.hash, (None, 0, False))
+
+            if move is not None and (complete or depth >= hit_depth):
+                conn.send((move, depth, True))
+
+            else:
+                search = session.get_search(game_id, state, banner_weight, card_weight, **options)
+                search.stop = stop
+
+                move, score, depth = search.iterative_deepening(state, max_depth, deadline)
+                conn.send((move, depth, False))
+
+
+class Ponderer:
+    '''
+    Background process searching for an agent, during its turns and the opponent's.
+    '''
+
+    def __init__(self, banner_weight, card_weight, hit_depth, **options):
+        self.stop = multiprocessing.Event()
+        self.conn, child_conn = multiprocessing.Pipe()
+
+        self.process = multiprocessing.Process(target=_ponder_worker, daemon=True,
+                                               args=(child_conn, self.stop, banner_weight, card_weight,
+                                                     hit_depth, options))
+        self.process.start()
+
+        self.pondering = False
+
+        self.moves = 0
+        self.hits = 0
+        self.pondered = 0
+
+    def ponder(self, game_id, state, player):
+        '''
+        This function starts pondering the replies of the opponent.
+
+        Parameters:
+            game_id (int): id of the game, from search.get_game_id
+            state (BoardState): the position, with the opponent to move
+            player (int): player of the opponent, 1 or 2
+        '''
+
+        self.interrupt()
+
+        self.conn.send(('ponder', game_id, _state_args(state), player))
+        self.pondering = True
+
+    def interrupt(self):
+        '''
+        This function stops the pondering, if any.
+        '''
+
+        if self.pondering:
+            self.stop.set()
+            self.pondered += self.conn.recv()
+            self.stop.clear()
+
+            self.pondering = False
+
+    def get_move(self, game_id, state, max_depth, deadline):
+        '''
+        This function gets the move of the agent, using the pondering if it hit.
+
+        Parameters:
+            game_id (int): id of the game, from search.get_game_id
+            state (BoardState): the position
+            max_depth (int): maximum depth of lookahead, or None to deepen until the deadline
+            deadline (float): time.time() at which the search stops
+
+        Returns:
+            move (int): location of the card, or None if there are no moves
+        '''
+
+        self.interrupt()
+
+        self.conn.send(('move', game_id, _state_args(state), max_depth, deadline))
+        move, depth, hit = self.conn.recv()
+
+        self.moves += 1
+        self.hits += hit
+
+        return move
+
+    def close(self):
+        '''
+        This function ends the pondering process.
+        '''
+
+        self.interrupt()
+
+        self.conn.send(None)
+        self.process.join()
+
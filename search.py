@@ -0,0 +1,1280 @@
+'''
+Alpha-beta search on the bitboard representation, shared by the minimax agents.
+
+Scores are always from the point of view of player 1, who is the maximizing
+player, as in the original minimax implementation. get_move searches the
+position seen by the agent (get_state_to_move), so the agent is player 1
+from either seat.
+'''
+
+import time
+
+from bitboard import (BoardState, LINE_MASKS, BETWEEN_MASKS, SIDE_KEY, NUM_SQUARES, SYMMETRIES, INVERSE_SYMMETRIES,
+                      popcount, squares_of)
+from evaluation import get_weights, get_proximity, get_leaf_features, score_features
+from transposition import TranspositionTable, EXACT, LOWER, UPPER, DEFAULT_SIZE_MB
+
+# The deadline is checked every CHECK_INTERVAL + 1 nodes (must be a power of two minus one)
+CHECK_INTERVAL = 1023
+
+# Move ordering scores, from the first moves searched to the last
+TT_MOVE_SCORE = 1 << 30
+CAPTURE_SCORE = 1 << 22  # Per card, for moves that collect more than one card
+BANNER_SCORE = 1 << 21  # Moves that take the banner of the house from the opponent
+KILLER_SCORES = (1 << 20, 1 << 19)
+HISTORY_MAX = (1 << 19) - 1
+
+MAX_PLY = 64
+
+# Width of the null window of the principal variation search; smaller than
+# any difference between two evaluations
+NULL_WINDOW = 1e-6
+
+# Late move reductions: quiet moves from LMR_MIN_INDEX on, at nodes with at
+# least LMR_MIN_DEPTH plies left, are searched LMR_REDUCTION plies shallower
+LMR_MIN_DEPTH = 3
+LMR_MIN_INDEX = 3
+LMR_REDUCTION = 1
+
+# Futility pruning is used at nodes with at most FUTILITY_DEPTH plies left
+FUTILITY_DEPTH = 2
+
+# Score of a won game in the endgame solver, minus the plies until the end of
+# the game so that faster wins score higher
+WIN_SCORE = 1000
+
+# Share of the memory cap of the search (tt_size_mb) given to the positions
+# solved by the endgame solver, the transposition table gets the rest
+SOLVED_SHARE = 0.25
+
+# Approximate size of one solved position in bytes: its key, the entry tuple,
+# its score object and the slot of the dict
+SOLVED_ENTRY_BYTES = 176
+
+# Share of the time of a move given to the endgame solver before falling back
+# to iterative deepening
+ENDGAME_TIME_SHARE = 0.75
+
+
+class SearchTimeout(Exception):
+    '''
+    Raised inside the search when the deadline has passed.
+    '''
+
+
+class Search:
+    '''
+    Alpha-beta minimax over BoardState objects with a transposition table.
+
+    The evaluation is the one of the agents: banners and cards in hand of each
+    player, and cards in reach of Varys of the houses each player leads,
+    weighted by the weight vector of banner_weight, card_weight and
+    proximity_weight (see evaluation.py). With ordering, moves are searched in
+    the order of order_moves instead of square order. With batch_leaves, the
+    leaves below a node of depth 1 are scored together from the node (see
+    search_leaves) instead of making each move.
+
+    With pvs, only the first move of a node is searched with the full window
+    and the others with a null window, re-searched when they fail high. With
+    an aspiration_window, each iteration of iterative_deepening starts with a
+    window of that half-width around the score of the previous one.
+
+    With lmr, late quiet moves are searched with a reduced depth first. With
+    futility, nodes near the leaves are cut when even the best move of the
+    player to move cannot reach its bound. With banner_bounds, nodes are cut
+    when no later position can reach the window, given the decided banners
+    and the cards left (see score_bounds).
+
+    With endgame_cards, positions with at most that many cards left on the
+    board are solved to the end of the game by solve instead, with scores of
+    WIN_SCORE minus the plies to the end for a win of player 1, the negation
+    for a win of player 2 and 0 for a game without banners. The solved
+    positions take SOLVED_SHARE of the memory cap tt_size_mb, and are all
+    dropped once they fill it.
+
+    With symmetry, the transposition table and the solved positions are keyed
+    by the canonical orientation of the position (see
+    BoardState.get_canonical), so the rotations and reflections of a position
+    share their entries; stored moves are in the canonical orientation.
+    '''
+
+    def __init__(self, banner_weight, card_weight, tt_size_mb=DEFAULT_SIZE_MB, ordering=True,
+                 pvs=False, aspiration_window=None, lmr=False, futility=False, banner_bounds=True,
+                 endgame_cards=0, symmetry=False, proximity_weight=0.0, batch_leaves=True):
+        self.banner_weight = banner_weight
+        self.card_weight = card_weight
+        self.proximity_weight = proximity_weight
+        self.weights = get_weights(banner_weight, card_weight, proximity_weight)
+        self.batch_leaves = batch_leaves
+        self.ordering = ordering
+        self.pvs = pvs
+        self.aspiration_window = aspiration_window
+        self.lmr = lmr
+        self.futility = futility
+        self.banner_bounds = banner_bounds
+        self.endgame_cards = endgame_cards
+        self.symmetry = symmetry
+
+        # The endgame solver shares the memory cap with the transposition table
+        if endgame_cards:
+            self.max_solved = max(1, int(tt_size_mb * SOLVED_SHARE * 1024 * 1024) // SOLVED_ENTRY_BYTES)
+            tt_size_mb *= 1 - SOLVED_SHARE
+
+        else:
+            self.max_solved = 0
+
+        self.tt = TranspositionTable(tt_size_mb)
+
+        # Positions solved by the endgame solver: key -> (flag, score, move),
+        # with win scores counted from the position instead of the root
+        self.solved = {}
+
+        # Killer moves per ply and history scores per player and square
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = [[0] * NUM_SQUARES, [0] * NUM_SQUARES]
+
+        # Principal variation of the last search: (hash, move) per ply, the
+        # hash including SIDE_KEY when player 2 is to move, with its depth and score
+        self.pv = []
+        self.pv_depth = 0
+        self.pv_score = None
+
+        self.nodes = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.researches = 0
+        self.aspiration_failures = 0
+        self.reductions = 0
+        self.reduction_researches = 0
+        self.futility_prunes = 0
+        self.bound_cutoffs = 0
+        self.solved_hits = 0
+        self.root_depth = 0
+        self.deadline = float('inf')
+        self.stop = None  # Event that also stops the search when set
+
+    def check_deadline(self):
+        '''
+        This function stops the search if the deadline passed or the stop event is set.
+        '''
+
+        if time.time() > self.deadline or (self.stop is not None and self.stop.is_set()):
+            raise SearchTimeout()
+
+    def evaluate(self, state):
+        '''
+        This function evaluates a state from the point of view of player 1.
+
+        The banners are the ones of the state, which make_move keeps up to
+        date, so banners decided inside the search count as such. The banner
+        and card differences are maintained by make_move, so this is O(1)
+        without the proximity.
+
+        Parameters:
+            state (BoardState): the position
+
+        Returns:
+            score (float): evaluation of the position
+        '''
+
+        score = state.banner_diff * self.banner_weight + state.card_diff * self.card_weight
+
+        if self.proximity_weight:
+            score += get_proximity(state.houses, state.hands, state.varys) * self.proximity_weight
+
+        return score
+
+    def score_bounds(self, state):
+        '''
+        This function bounds the evaluation of any position reachable from a state.
+
+        The banner difference stays within get_banner_bounds, the difference
+        of cards in hand moves by at most the cards left on the board, and the
+        proximity is at most the cards left in absolute value.
+
+        Parameters:
+            state (BoardState): the position
+
+        Returns:
+            lower (float): lowest reachable evaluation
+            upper (float): highest reachable evaluation
+        '''
+
+        banner_lower, banner_upper = state.get_banner_bounds()
+        card_diff = state.card_diff
+        remaining = popcount(state.occupied)
+
+        lower = banner_lower * self.banner_weight + (card_diff - remaining) * self.card_weight
+        upper = banner_upper * self.banner_weight + (card_diff + remaining) * self.card_weight
+
+        proximity_range = remaining * abs(self.proximity_weight)
+
+        return lower - proximity_range, upper + proximity_range
+
+    def order_moves(self, state, moves_mask, player, tt_move, ply):
+        '''
+        This function sorts the moves of a position, most promising first.
+
+        The move of the transposition table comes first, then the moves that
+        collect the most cards, then the moves that take a banner, then the
+        killer moves, and the rest by history score.
+
+        Parameters:
+            state (BoardState): the position
+            moves_mask (int): bitboard of the possible moves
+            player (int): player to move, 1 or 2
+            tt_move (int): best move stored in the transposition table, or None
+            ply (int): distance from the root
+
+        Returns:
+            moves (list): the moves, sorted
+        '''
+
+        varys_between = BETWEEN_MASKS[state.varys]
+        houses = state.houses
+        squares = state.squares
+        banners = state.banners
+        hand = state.hands[player - 1]
+        opponent_hand = state.hands[2 - player]
+        killer1, killer2 = self.killers[ply] if ply < MAX_PLY else (None, None)
+        history = self.history[player - 1]
+
+        scored = []
+
+        for move in squares_of(moves_mask):
+            if move == tt_move:
+                scored.append((TT_MOVE_SCORE, move))
+                continue
+
+            house = squares[move]
+            count = popcount(varys_between[move] & houses[house]) + 1
+
+            score = history[move]
+
+            if count > 1:
+                score += CAPTURE_SCORE * count
+
+            if banners[house] != player and hand[house] + count >= opponent_hand[house]:
+                score += BANNER_SCORE
+
+            if move == killer1:
+                score += KILLER_SCORES[0]
+
+            elif move == killer2:
+                score += KILLER_SCORES[1]
+
+            scored.append((score, move))
+
+        # The sort is stable, so equal scores keep the square order
+        scored.sort(key=lambda item: item[0], reverse=True)
+
+        return [move for _, move in scored]
+
+    def record_cutoff(self, move, player, depth, ply, index):
+        '''
+        This function updates the statistics, killer moves and history after a cutoff.
+
+        Parameters:
+            move (int): move that caused the cutoff
+            player (int): player who made the move
+            depth (int): remaining depth of the node
+            ply (int): distance of the node from the root
+            index (int): position of the move in the move list
+        '''
+
+        self.cutoffs += 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+
+        history = self.history[player - 1]
+        history[move] = min(history[move] + depth * depth, HISTORY_MAX)
+
+    def is_quiet(self, state, move, player):
+        '''
+        This function checks if a move only takes the selected card and no banner.
+
+        Parameters:
+            state (BoardState): the position
+            move (int): location of the selected card
+            player (int): player to move, 1 or 2
+
+        Returns:
+            quiet (bool): True if the move collects one card and keeps the banners
+        '''
+
+        house = state.squares[move]
+
+        if BETWEEN_MASKS[state.varys][move] & state.houses[house]:
+            return False
+
+        return state.banners[house] == player or state.hands[player - 1][house] + 1 < state.hands[2 - player][house]
+
+    def max_move_gain(self, state, moves_mask, player):
+        '''
+        This function bounds how much one move can change the evaluation.
+
+        A move collects cards of one house, so at most the banner of that house
+        changes hands: a swing of two banners if the opponent holds it, one if
+        nobody does, none if the banner is decided.
+
+        Parameters:
+            state (BoardState): the position
+            moves_mask (int): bitboard of the possible moves
+            player (int): player to move, 1 or 2
+
+        Returns:
+            gain (float): largest change of the evaluation in favor of the player
+        '''
+
+        varys_between = BETWEEN_MASKS[state.varys]
+        houses = state.houses
+        squares = state.squares
+        banners = state.banners
+        hand = state.hands[player - 1]
+        opponent_hand = state.hands[2 - player]
+
+        decided = state.decided
+
+        max_gain = 0
+
+        for move in squares_of(moves_mask):
+            house = squares[move]
+            count = popcount(varys_between[move] & houses[house]) + 1
+
+            gain = count * self.card_weight
+
+            if not decided >> house & 1 and banners[house] != player and hand[house] + count >= opponent_hand[house]:
+                gain += self.banner_weight if banners[house] == 0 else 2 * self.banner_weight
+
+            max_gain = max(max_gain, gain)
+
+        return max_gain
+
+    def search_move(self, state, move, player, depth, alpha, beta, index, reduce):
+        '''
+        This function makes a move, searches the position after it and takes it back.
+
+        With pvs, every move but the first is first searched with a null
+        window. A reduced move is first searched LMR_REDUCTION plies shallower
+        with a null window. Either way, the move is searched again with the
+        full window and depth when it turns out better than the bound of the
+        player to move.
+
+        Parameters:
+            state (BoardState): the position
+            move (int): location of the selected card
+            player (int): player making the move, 1 or 2
+            depth (int): remaining depth of the node
+            alpha (float): lower bound
+            beta (float): upper bound
+            index (int): position of the move in the move list
+            reduce (bool): True to search the move with a late move reduction
+
+        Returns:
+            score (float): score of the move
+        '''
+
+        undo = state.make_move(move, player)
+        child_maximizing = player == 2
+
+        # Null window just above alpha for player 1, just below beta for player 2
+        if player == 1:
+            null_alpha, null_beta = alpha, alpha + NULL_WINDOW
+
+        else:
+            null_alpha, null_beta = beta - NULL_WINDOW, beta
+
+        score = None
+
+        if reduce:
+            self.reductions += 1
+            score = self.minimax(state, max(depth - 1 - LMR_REDUCTION, 0), child_maximizing, null_alpha, null_beta)
+
+            if (player == 1 and score > alpha) or (player == 2 and score < beta):
+                self.reduction_researches += 1
+                score = None
+
+        if score is None and index > 0 and self.pvs:
+            score = self.minimax(state, depth - 1, child_maximizing, null_alpha, null_beta)
+
+            if alpha < score < beta:
+                self.researches += 1
+                score = None
+
+        if score is None:
+            score = self.minimax(state, depth - 1, child_maximizing, alpha, beta)
+
+        state.unmake_move(undo)
+
+        return score
+
+    def search_leaves(self, state, moves, player, alpha, beta, ply):
+        '''
+        This function searches a node of depth 1, whose children are all leaves.
+
+        The leaves are scored together with get_leaf_features and
+        score_features, without making the moves. All the scores are known at
+        once, so the moves need no ordering: the score of the node is the best
+        of them, and the best move causes the cutoff if there is one.
+
+        Parameters:
+            state (BoardState): the position
+            moves (list): moves of the player to move
+            player (int): player to move, 1 or 2
+            alpha (float): lower bound
+            beta (float): upper bound
+            ply (int): distance of the node from the root
+
+        Returns:
+            best_score (float): score of the node
+            best_move (int): best move
+        '''
+
+        scores = score_features(get_leaf_features(state, moves, player, self.proximity_weight != 0), self.weights)
+
+        best_score = max(scores) if player == 1 else min(scores)
+        best_move = moves[scores.index(best_score)]
+
+        if (best_score >= beta) if player == 1 else (best_score <= alpha):
+            self.record_cutoff(best_move, player, 1, ply, 0)
+
+        # Each leaf scored counts as a node, as if it had been searched
+        nodes = self.nodes
+        self.nodes += len(moves)
+
+        if (self.nodes ^ nodes) & ~CHECK_INTERVAL:
+            self.check_deadline()
+
+        return best_score, best_move
+
+    def minimax(self, state, depth, maximizing_player, alpha, beta):
+        '''
+        This function searches a state with alpha-beta pruning.
+
+        Moves are made and taken back on the state itself, so the state is
+        unchanged when the function returns. If the deadline passes, it raises
+        SearchTimeout and leaves the state in the middle of the line searched.
+
+        Parameters:
+            state (BoardState): the position
+            depth (int): remaining depth
+            maximizing_player (bool): True if player 1 is to move
+            alpha (float): lower bound
+            beta (float): upper bound
+
+        Returns:
+            score (float): minimax value of the position
+        '''
+
+        self.nodes += 1
+
+        if not self.nodes & CHECK_INTERVAL:
+            self.check_deadline()
+
+        moves_mask = LINE_MASKS[state.varys] & state.occupied
+
+        if depth == 0 or moves_mask == 0:
+            return self.evaluate(state)
+
+        if self.symmetry:
+            key, transform = state.get_canonical()
+
+        else:
+            key, transform = state.hash, 0
+
+        if not maximizing_player:
+            key ^= SIDE_KEY
+
+        entry = self.tt.probe(key)
+
+        if entry is not None and entry[1] >= depth:
+            flag, score = entry[2], entry[3]
+
+            if flag == EXACT:
+                return score
+
+            elif flag == LOWER:
+                alpha = max(alpha, score)
+
+            else:
+                beta = min(beta, score)
+
+            if beta <= alpha:
+                return score
+
+        player = 1 if maximizing_player else 2
+
+        # Cut the node if no position below it can get inside the window
+        if self.banner_bounds:
+            lower, upper = self.score_bounds(state)
+
+            if upper <= alpha:
+                self.bound_cutoffs += 1
+                return upper
+
+            if lower >= beta:
+                self.bound_cutoffs += 1
+                return lower
+
+        # Futility pruning: near the leaves, only the moves of the player to
+        # move can raise its score, so the best gain of one of its moves bounds
+        # the score of the node
+        if self.futility and depth <= FUTILITY_DEPTH:
+            static_score = self.evaluate(state)
+
+            # Every move gains at least one card; a move gains at most the
+            # cards on the line of Varys and two banners
+            if maximizing_player:
+                margin = alpha - static_score
+
+            else:
+                margin = static_score - beta
+
+            # The proximity can move anywhere within the cards left
+            proximity_swing = 2 * popcount(state.occupied) * abs(self.proximity_weight)
+
+            if margin >= self.card_weight:
+                max_gain = popcount(moves_mask) * self.card_weight + 2 * self.banner_weight + proximity_swing
+
+                if max_gain > margin:
+                    max_gain = self.max_move_gain(state, moves_mask, player) + proximity_swing
+
+                if max_gain <= margin:
+                    self.futility_prunes += 1
+                    return static_score + max_gain if maximizing_player else static_score - max_gain
+
+        alpha_orig, beta_orig = alpha, beta
+        best_move = None
+
+        ply = self.root_depth - depth
+
+        tt_move = entry[4] if entry is not None else None
+        if transform and tt_move is not None:
+            tt_move = INVERSE_SYMMETRIES[transform][tt_move]
+
+        if depth == 1 and self.batch_leaves:
+            moves = squares_of(moves_mask)
+
+        elif self.ordering:
+            moves = self.order_moves(state, moves_mask, player, tt_move, ply)
+
+        else:
+            moves = squares_of(moves_mask)
+
+        reduce_late_moves = self.lmr and depth >= LMR_MIN_DEPTH
+
+        if depth == 1 and self.batch_leaves:
+            best_score, best_move = self.search_leaves(state, moves, player, alpha, beta, ply)
+
+        elif maximizing_player:
+            max_eval = -float('inf')
+
+            for index, move in enumerate(moves):
+                reduce = reduce_late_moves and index >= LMR_MIN_INDEX and self.is_quiet(state, move, player)
+                eval_score = self.search_move(state, move, player, depth, alpha, beta, index, reduce)
+
+                if eval_score > max_eval:
+                    max_eval = eval_score
+                    best_move = move
+
+                alpha = max(alpha, eval_score)
+
+                if beta <= alpha:
+                    self.record_cutoff(move, player, depth, ply, index)
+                    break
+
+            best_score = max_eval
+
+        else:
+            min_eval = float('inf')
+
+            for index, move in enumerate(moves):
+                reduce = reduce_late_moves and index >= LMR_MIN_INDEX and self.is_quiet(state, move, player)
+                eval_score = self.search_move(state, move, player, depth, alpha, beta, index, reduce)
+
+                if eval_score < min_eval:
+                    min_eval = eval_score
+                    best_move = move
+
+                beta = min(beta, eval_score)
+
+                if beta <= alpha:
+                    self.record_cutoff(move, player, depth, ply, index)
+                    break
+
+            best_score = min_eval
+
+        if best_score <= alpha_orig:
+            flag = UPPER
+
+        elif best_score >= beta_orig:
+            flag = LOWER
+
+        else:
+            flag = EXACT
+
+        if transform and best_move is not None:
+            best_move = SYMMETRIES[transform][best_move]
+
+        self.tt.store(key, depth, flag, best_score, best_move)
+
+        return best_score
+
+    def solve(self, state, ply, maximizing_player, alpha, beta):
+        '''
+        This function solves a state exactly, searching to the end of the game.
+
+        Terminal positions are scored with get_winner, which follows the
+        tiebreak order of calculate_winner. A win of player 1 scores WIN_SCORE
+        minus ply, so the fastest win and the slowest loss are preferred.
+
+        Parameters:
+            state (BoardState): the position
+            ply (int): number of moves made since the root
+            maximizing_player (bool): True if player 1 is to move
+            alpha (float): lower bound
+            beta (float): upper bound
+
+        Returns:
+            score (int): exact score of the position, or a bound if it is
+                outside the window
+        '''
+
+        self.nodes += 1
+
+        if not self.nodes & CHECK_INTERVAL:
+            self.check_deadline()
+
+        moves_mask = LINE_MASKS[state.varys] & state.occupied
+
+        if moves_mask == 0:
+            winner = state.get_winner()
+
+            if winner is None:
+                return 0
+
+            return WIN_SCORE - ply if winner == 1 else ply - WIN_SCORE
+
+        # Once the winner is known, the game ends after one to all of the
+        # cards left, which bounds the score
+        if state.is_outcome_decided():
+            winner = 1 if state.locked_diff > 0 else 2 if state.locked_diff < 0 else state.get_winner()
+            remaining = popcount(state.occupied)
+
+            if winner == 1:
+                lower, upper = WIN_SCORE - ply - remaining, WIN_SCORE - ply - 1
+
+            else:
+                lower, upper = ply + 1 - WIN_SCORE, ply + remaining - WIN_SCORE
+
+            if upper <= alpha:
+                self.bound_cutoffs += 1
+                return upper
+
+            if lower >= beta:
+                self.bound_cutoffs += 1
+                return lower
+
+        if self.symmetry:
+            key, transform = state.get_canonical()
+
+        else:
+            key, transform = state.hash, 0
+
+        if not maximizing_player:
+            key ^= SIDE_KEY
+
+        entry = self.solved.get(key)
+
+        if entry is not None:
+            flag, score, move = entry
+
+            # Stored win scores count the plies from the position itself
+            if score > 0:
+                score -= ply
+
+            elif score < 0:
+                score += ply
+
+            if flag == EXACT:
+                self.solved_hits += 1
+                return score
+
+            elif flag == LOWER:
+                alpha = max(alpha, score)
+
+            else:
+                beta = min(beta, score)
+
+            if beta <= alpha:
+                self.solved_hits += 1
+                return score
+
+        alpha_orig, beta_orig = alpha, beta
+        player = 1 if maximizing_player else 2
+
+        solved_move = entry[2] if entry is not None else None
+        if transform and solved_move is not None:
+            solved_move = INVERSE_SYMMETRIES[transform][solved_move]
+
+        if self.ordering:
+            moves = self.order_moves(state, moves_mask, player, solved_move, ply)
+
+        else:
+            moves = squares_of(moves_mask)
+
+        best_score = -WIN_SCORE - 1 if maximizing_player else WIN_SCORE + 1
+        best_move = None
+
+        for index, move in enumerate(moves):
+            undo = state.make_move(move, player)
+            score = self.solve(state, ply + 1, not maximizing_player, alpha, beta)
+            state.unmake_move(undo)
+
+            if maximizing_player:
+                if score > best_score:
+                    best_score, best_move = score, move
+
+                alpha = max(alpha, score)
+
+            else:
+                if score < best_score:
+                    best_score, best_move = score, move
+
+                beta = min(beta, score)
+
+            if beta <= alpha:
+                self.record_cutoff(move, player, popcount(moves_mask), ply, index)
+                break
+
+        if best_score <= alpha_orig:
+            flag = UPPER
+
+        elif best_score >= beta_orig:
+            flag = LOWER
+
+        else:
+            flag = EXACT
+
+        if len(self.solved) >= self.max_solved:
+            self.solved.clear()
+
+        if transform and best_move is not None:
+            best_move = SYMMETRIES[transform][best_move]
+
+        stored = best_score + ply if best_score > 0 else best_score - ply if best_score < 0 else 0
+        self.solved[key] = (flag, stored, best_move)
+
+        return best_score
+
+    def solve_root(self, state, root_moves):
+        '''
+        This function solves the root moves of player 1 to the end of the game.
+
+        Parameters:
+            state (BoardState): the root position
+            root_moves (list): moves to search, in order
+
+        Returns:
+            best_move (int): location of the card, or None if there are no moves
+            best_score (int): exact score of the best move
+        '''
+
+        best_move = None
+        best_score = -WIN_SCORE - 1
+        alpha = -WIN_SCORE - 1
+
+        for move in root_moves:
+            undo = state.make_move(move, 1)
+            score = self.solve(state, 1, False, alpha, WIN_SCORE + 1)
+            state.unmake_move(undo)
+
+            if score > best_score:
+                best_score, best_move = score, move
+
+            alpha = max(alpha, score)
+
+            # Nothing beats winning with this move
+            if score == WIN_SCORE - 1:
+                break
+
+        return best_move, best_score
+
+    def new_root(self, state):
+        '''
+        This function copies a position for the search to run on.
+
+        Parameters:
+            state (BoardState): the root position
+
+        Returns:
+            root (BoardState): a copy, keeping the hashes of its images with symmetry
+        '''
+
+        root = state.copy()
+
+        if self.symmetry and root.sym_hashes is None:
+            root.enable_symmetry()
+
+        return root
+
+    def probe_move(self, state, maximizing_player):
+        '''
+        This function gets the best move stored in the transposition table for a position.
+
+        Parameters:
+            state (BoardState): the position
+            maximizing_player (bool): True if player 1 is to move
+
+        Returns:
+            move (int): location of the card, or None if the position is not stored
+        '''
+
+        if self.symmetry:
+            key, transform = state.get_canonical()
+
+        else:
+            key, transform = state.hash, 0
+
+        entry = self.tt.probe(key if maximizing_player else key ^ SIDE_KEY)
+
+        if entry is None or entry[4] is None:
+            return None
+
+        return INVERSE_SYMMETRIES[transform][entry[4]] if transform else entry[4]
+
+    def get_pv(self, state, best_move):
+        '''
+        This function follows the best moves of the transposition table from a root move.
+
+        Parameters:
+            state (BoardState): the root position
+            best_move (int): best move of the root
+
+        Returns:
+            pv (list): (hash, move) per ply, the hash including SIDE_KEY when
+                player 2 is to move
+        '''
+
+        position = self.new_root(state)
+        pv = []
+        move = best_move
+        maximizing_player = True
+
+        while move is not None and len(pv) < MAX_PLY and position.get_moves_mask() >> move & 1:
+            pv.append((position.hash if maximizing_player else position.hash ^ SIDE_KEY, move))
+            position.make_move(move, 1 if maximizing_player else 2)
+
+            maximizing_player = not maximizing_player
+            move = self.probe_move(position, maximizing_player)
+
+        return pv
+
+    def get_root_move(self, state):
+        '''
+        This function gets the move to search first at the root.
+
+        It is the move of the previous principal variation if the game
+        followed it, or else the move of the transposition table.
+
+        Parameters:
+            state (BoardState): the root position, player 1 to move
+
+        Returns:
+            move (int): location of the card, or None
+            depth (int): depth to which the previous search already searched
+                the position, 0 if it is not on the principal variation
+        '''
+
+        for ply, (key, move) in enumerate(self.pv):
+            if key == state.hash:
+                return move, max(self.pv_depth - ply, 0)
+
+        return self.probe_move(state, True), 0
+
+    def start_next_move(self):
+        '''
+        This function prepares the search for the next move of the same game.
+
+        The transposition table and the principal variation are kept. The
+        killer moves are cleared, since their plies now refer to other
+        positions, and the history scores are halved so that recent cutoffs
+        weigh more.
+        '''
+
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+
+        for history in self.history:
+            for square in range(NUM_SQUARES):
+                history[square] >>= 1
+
+    def start_search(self, state, deadline):
+        '''
+        This function prepares a new search from a root position.
+
+        Parameters:
+            state (BoardState): the root position
+            deadline (float): time.time() at which the search stops
+        '''
+
+        self.deadline = deadline
+        self.tt.new_search()
+
+    def search_root(self, state, depth, root_moves, alpha=-float('inf'), beta=float('inf')):
+        '''
+        This function searches the root moves of player 1 to a fixed depth.
+
+        Parameters:
+            state (BoardState): the root position
+            depth (int): depth of lookahead
+            root_moves (list): moves to search, in order
+            alpha (float): lower bound of the window
+            beta (float): upper bound of the window
+
+        Returns:
+            best_move (int): location of the card, or None if there are no moves
+            best_score (float): score of the best move; if it is not inside the
+                window, it is only a bound and best_move is not reliable
+        '''
+
+        self.root_depth = depth
+
+        best_move = None
+        best_score = -float('inf')
+
+        for index, move in enumerate(root_moves):
+            score = self.search_move(state, move, 1, depth, alpha, beta, index, False)
+
+            if score > best_score:
+                best_score = score
+                best_move = move
+
+            alpha = max(alpha, score)
+
+            if alpha >= beta:
+                break
+
+        return best_move, best_score
+
+    def get_best_move(self, state, depth, deadline):
+        '''
+        This function finds the best move for player 1 with a fixed-depth search.
+
+        Parameters:
+            state (BoardState): the position
+            depth (int): depth of lookahead
+            deadline (float): time.time() at which the search stops
+
+        Returns:
+            best_move (int): location of the card, or None if there are no moves
+                or the deadline passed
+        '''
+
+        self.start_search(state, deadline)
+
+        try:
+            return self.search_root(self.new_root(state), depth, state.get_moves())[0]
+
+        except SearchTimeout:
+            return None
+
+    def iterative_deepening(self, state, max_depth, deadline):
+        '''
+        This function finds the best move for player 1 with iterative deepening.
+
+        Each iteration searches one ply deeper, starting with the best move of
+        the previous one. When the deadline passes inside an iteration, that
+        iteration is dropped and the result of the last completed one is kept.
+        If the winner is already decided, the first move is played at depth 0.
+        With endgame_cards, the end of the game is solved exactly first.
+
+        Parameters:
+            state (BoardState): the position
+            max_depth (int): maximum depth, or None to deepen until the deadline
+            deadline (float): time.time() at which the search stops
+
+        Returns:
+            best_move (int): location of the card, or None if there are no moves
+            best_score (float): score of the best move
+            depth (int): depth of the last completed iteration
+        '''
+
+        self.start_search(state, deadline)
+
+        root_move, pv_depth = self.get_root_move(state)
+
+        if self.ordering:
+            root_moves = self.order_moves(state, state.get_moves_mask(), 1, root_move, 0)
+
+        else:
+            root_moves = state.get_moves()
+
+        if not root_moves:
+            return None, None, 0
+
+        # Solve the end of the game exactly in a share of the time, and fall
+        # back to the iterations below if it does not finish
+        if popcount(state.occupied) <= self.endgame_cards:
+            now = time.time()
+            self.deadline = now + (deadline - now) * ENDGAME_TIME_SHARE
+
+            try:
+                move, score = self.solve_root(self.new_root(state), root_moves)
+                return move, score, popcount(state.occupied)
+
+            except SearchTimeout:
+                self.deadline = deadline
+
+        # Once the winner can no longer change, play without searching
+        if state.is_outcome_decided():
+            return root_moves[0], self.evaluate(state), 0
+
+        # Fall back to the first move if not even depth 1 completes
+        best_move, best_score, completed_depth = root_moves[0], None, 0
+
+        # On the previous principal variation, the iterations the previous
+        # search already covered are skipped, centered on its score
+        first_depth = 1
+        if pv_depth > 1:
+            first_depth, best_score = pv_depth, self.pv_score
+
+        # Searching deeper than the number of cards left cannot change the result
+        last_depth = popcount(state.occupied)
+        if max_depth is not None:
+            last_depth = min(last_depth, max_depth)
+
+        # The search runs on a copy, which an aborted iteration may leave modified
+        root = self.new_root(state)
+
+        for depth in range(min(first_depth, last_depth), last_depth + 1):
+            try:
+                if self.aspiration_window is not None and best_score is not None:
+                    alpha = best_score - self.aspiration_window
+                    beta = best_score + self.aspiration_window
+
+                    move, score = self.search_root(root, depth, root_moves, alpha, beta)
+
+                    # Search again with the full window if the score is outside the window
+                    if score <= alpha or score >= beta:
+                        self.aspiration_failures += 1
+                        move, score = self.search_root(root, depth, root_moves)
+
+                else:
+                    move, score = self.search_root(root, depth, root_moves)
+
+            except SearchTimeout:
+                break
+
+            best_move, best_score, completed_depth = move, score, depth
+
+            # Search the best move first in the next iteration
+            root_moves.remove(move)
+            root_moves.insert(0, move)
+
+        if completed_depth:
+            self.pv = self.get_pv(state, best_move)
+            self.pv_depth = completed_depth
+            self.pv_score = best_score
+
+        return best_move, best_score, completed_depth
+
+
+class Session:
+    '''
+    Search kept by an agent between the get_move calls of a game.
+
+    The transposition table, history scores and principal variation of the
+    Search carry over to the next move of the same game. A new Search is
+    started when the game id or the search settings change, or when the
+    board has as many cards as at the previous call, which only happens in
+    a new game.
+    '''
+
+    def __init__(self):
+        self.search = None
+        self.game_id = None
+        self.settings = None
+        self.cards_left = None
+
+        self.games = 0
+        self.moves = 0
+
+    def get_search(self, game_id, state, banner_weight, card_weight, **options):
+        '''
+        This function gets the Search of a game.
+
+        Parameters:
+            game_id (int): id of the game, from get_game_id
+            state (BoardState): the position to search
+            banner_weight (float): weight of a banner in the evaluation
+            card_weight (float): weight of a card in hand in the evaluation
+            options (dict): keyword arguments of Search
+
+        Returns:
+            search (Search): the Search of the game
+        '''
+
+        settings = (banner_weight, card_weight, sorted(options.items()))
+        cards_left = popcount(state.occupied)
+
+        if (self.search is None or game_id != self.game_id or settings != self.settings
+                or cards_left >= self.cards_left):
+            self.search = Search(banner_weight, card_weight, **options)
+            self.game_id = game_id
+            self.settings = settings
+            self.games += 1
+
+        else:
+            self.search.start_next_move()
+
+        self.cards_left = cards_left
+        self.moves += 1
+
+        return self.search
+
+
+def get_game_id(cards, player1, player2):
+    '''
+    This function identifies a game by its starting board.
+
+    Collected cards keep their location, so the starting board is the cards
+    on the board and in the hands; the square left empty is the starting
+    square of Varys.
+
+    Parameters:
+        cards (list): list of Card objects
+        player1 (Player): player 1
+        player2 (Player): player 2
+
+    Returns:
+        game_id (int): hash of the starting board
+    '''
+
+    board = [None] * NUM_SQUARES
+
+    for card in cards:
+        if card.get_name() != 'Varys':
+            board[card.get_location()] = (card.get_house(), card.get_name())
+
+    for player in (player1, player2):
+        for house_cards in player.get_cards().values():
+            for card in house_cards:
+                board[card.get_location()] = (card.get_house(), card.get_name())
+
+    return hash(tuple(board))
+
+
+def get_player_to_move(cards, player1, player2):
+    '''
+    This function finds the player to move from the objects passed to get_move.
+
+    Varys stands on the square of the last selected card, which keeps its
+    location in the hand of the player who took it, so the other player is
+    to move. Before the first move, player 1 is to move. This is only a
+    guess: after a passed turn (a move out of time or not on the board) the
+    same player moves again, so callers that know the seat pass it instead.
+
+    Parameters:
+        cards (list): list of Card objects
+        player1 (Player): player 1
+        player2 (Player): player 2
+
+    Returns:
+        player (int): 1 or 2
+    '''
+
+    varys = next((card.get_location() for card in cards if card.get_name() == 'Varys'), None)
+
+    for player, other in ((player1, 2), (player2, 1)):
+        for house_cards in player.get_cards().values():
+            if any(card.get_location() == varys for card in house_cards):
+                return other
+
+    return 1
+
+
+def get_state_to_move(cards, player1, player2, turn=None):
+    '''
+    This function builds the position seen by the player to move.
+
+    The search always plays player 1, so from seat 2 the players are swapped
+    (see BoardState.get_swapped): the moves are the same squares and the
+    rules are symmetric, so it is the game being played.
+
+    Parameters:
+        cards (list): list of Card objects
+        player1 (Player): player 1
+        player2 (Player): player 2
+        turn (int): player to move, 1 or 2, or None to guess it with get_player_to_move
+
+    Returns:
+        state (BoardState): the position, with the player to move as player 1
+    '''
+
+    state = BoardState.from_cards(cards, player1, player2)
+
+    if (turn or get_player_to_move(cards, player1, player2)) == 2:
+        state = state.get_swapped()
+
+    return state
+
+
+def get_move(cards, player1, player2, max_depth, banner_weight, card_weight, timeout, book=None, workers=1,
+             ponderer=None, session=None, turn=None, **options):
+    '''
+    This function runs the search for an agent.
+
+    Parameters:
+        cards (list): list of Card objects
+        player1 (Player): player 1
+        player2 (Player): player 2
+        max_depth (int): maximum depth of lookahead, or None to deepen until the timeout
+        banner_weight (float): weight of a banner in the evaluation
+        card_weight (float): weight of a card in hand in the evaluation
+        timeout (float): time budget in seconds
+        book (OpeningBook): opening book tried before searching, or None
+        workers (int): number of worker processes, 1 to search in this process
+        ponderer (Ponderer): pondering process that searches instead, or None
+        session (Session): session keeping the Search between moves of a game, or None
+        turn (int): player to move, 1 or 2, or None to guess it (see get_player_to_move)
+        options (dict): keyword arguments of Search (tt_size_mb, pvs, ...)
+
+    Returns:
+        move (int): location of the card, or None if there are no moves
+    '''
+
+    deadline = time.time() + timeout
+
+    # The book, the pondering and the search all see the agent as player 1
+    state = get_state_to_move(cards, player1, player2, turn)
+
+    if book is not None:
+        move = book.lookup(state)
+
+        if move is not None:
+            return move
+
+    # The pondering process keeps what it searched during the opponent's turn
+    if ponderer is not None:
+        return ponderer.get_move(get_game_id(cards, player1, player2), state, max_depth, deadline)
+
+    if workers > 1:
+        # Imported here since parallel imports this module
+        from parallel import ParallelSearch
+
+        engine = ParallelSearch(banner_weight, card_weight, workers, **options)
+
+    elif session is not None:
+        engine = session.get_search(get_game_id(cards, player1, player2), state, banner_weight, card_weight,
+                                    **options)
+
+    else:
+        engine = Search(banner_weight, card_weight, **options)
+
+    return engine.iterative_deepening(state, max_depth, deadline)[0]
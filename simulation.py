@@ -0,0 +1,349 @@
+'''
+Batched simulation of many games at once with NumPy.
+
+GameBatch holds N independent games as arrays: the house on each square,
+the square of Varys, the hand counts per player and house, the banner
+owners and the player to move. Legal moves, captures and banners are
+computed for all the games at once with the rules of main.py, so simple
+policies play thousands of games per second for statistics and data
+generation. The kernel follows BoardState move for move (see
+GameBatch.from_states and benchmark.py simulation).
+
+Policies take a GameBatch and a NumPy random generator and return one move
+per game (ignored for finished games).
+'''
+
+import numpy as np
+
+from bitboard import BOARD_SIZE, HOUSE_SIZES, NUM_HOUSES, NUM_SQUARES, EMPTY
+
+# Score of a won game for the shallow policy, above any banner and card gain
+WIN_GAIN = 1000
+
+
+def _build_tables():
+    '''
+    This function builds the line and between tables of the squares.
+
+    Returns:
+        lines (ndarray): lines[a, b] is True if b is on the row or column of a, b != a
+        between (ndarray): between[a, b, c] is True if c is strictly between a and b on their row or column
+    '''
+
+    rows, cols = np.divmod(np.arange(NUM_SQUARES), BOARD_SIZE)
+
+    same_row = rows[:, None] == rows[None, :]
+    same_col = cols[:, None] == cols[None, :]
+    lines = (same_row | same_col) & ~np.eye(NUM_SQUARES, dtype=bool)
+
+    a, b, c = (index.reshape(-1) for index in np.indices((NUM_SQUARES,) * 3))
+    row_between = same_row[a, b] & same_row[a, c] & (np.minimum(cols[a], cols[b]) < cols[c]) & (
+        cols[c] < np.maximum(cols[a], cols[b]))
+    col_between = same_col[a, b] & same_col[a, c] & (np.minimum(rows[a], rows[b]) < rows[c]) & (
+        rows[c] < np.maximum(rows[a], rows[b]))
+    between = (row_between | col_between).reshape((NUM_SQUARES,) * 3)
+
+    return lines, between
+
+
+LINES, BETWEEN = _build_tables()
+
+# Houses of the 35 cards of a board, Varys is EMPTY
+DECK = np.array([EMPTY] + [house for house in range(NUM_HOUSES) for _ in range(HOUSE_SIZES[house])], dtype=np.int8)
+
+class GameBatch:
+    '''
+    N games stored as arrays, one row per game.
+
+    squares[i, s] is the house on square s (EMPTY if there is no card),
+    varys[i] the square of Varys, hands[i, p, h] the number of cards of
+    house h in the hand of player p + 1, banners[i, h] the owner of the
+    banner of house h (0 if nobody holds it) and player[i] the player to
+    move. over[i] is True once the player to move has no moves.
+    '''
+
+    __slots__ = ('squares', 'varys', 'hands', 'banners', 'player', 'over')
+
+    def __init__(self, squares, varys, hands, banners, player):
+        self.squares = squares
+        self.varys = varys
+        self.hands = hands
+        self.banners = banners
+        self.player = player
+        self.over = ~self.get_moves().any(axis=1)
+
+    @classmethod
+    def random(cls, count, rng):
+        '''
+        This function creates games on random boards.
+
+        Parameters:
+            count (int): number of games
+            rng (Generator): NumPy random generator
+
+        Returns:
+            batch (GameBatch): the games, player 1 to move
+        '''
+
+        squares = DECK[np.argsort(rng.random((count, NUM_SQUARES)), axis=1)]
+        varys = np.argmax(squares == EMPTY, axis=1)
+
+        return cls(squares, varys, np.zeros((count, 2, NUM_HOUSES), dtype=np.int16),
+                   np.zeros((count, NUM_HOUSES), dtype=np.int8), np.ones(count, dtype=np.int8))
+
+    @classmethod
+    def from_states(cls, states, player=1):
+        '''
+        This function creates games from positions.
+
+        Parameters:
+            states (list): list of BoardState objects
+            player (int): player to move in every game
+
+        Returns:
+            batch (GameBatch): the games
+        '''
+
+        squares = np.array([state.squares for state in states], dtype=np.int8).reshape(-1, NUM_SQUARES)
+        varys = np.array([state.varys for state in states], dtype=np.int64)
+        hands = np.array([state.hands for state in states], dtype=np.int16).reshape(-1, 2, NUM_HOUSES)
+        banners = np.array([state.banners for state in states], dtype=np.int8).reshape(-1, NUM_HOUSES)
+
+        return cls(squares, varys, hands, banners, np.full(len(states), player, dtype=np.int8))
+
+    def __len__(self):
+        return len(self.varys)
+
+    def take(self, games):
+        '''
+        This function copies some of the games.
+
+        Parameters:
+            games (ndarray): indices of the games to copy, possibly repeated
+
+        Returns:
+            batch (GameBatch): the copies, in the order of games
+        '''
+
+        batch = GameBatch.__new__(GameBatch)
+
+        for name in self.__slots__:
+            setattr(batch, name, getattr(self, name)[games])
+
+        return batch
+
+    def get_moves(self):
+        '''
+        This function gets the legal moves of the player to move.
+
+        Returns:
+            moves (ndarray): moves[i, s] is True if the card on square s can be selected in game i
+        '''
+
+        return LINES[self.varys] & (self.squares != EMPTY)
+
+    def get_captures(self):
+        '''
+        This function counts the cards each move would take.
+
+        Returns:
+            captures (ndarray): captures[i, s] is the number of cards taken by
+                selecting square s in game i, 0 for illegal moves
+        '''
+
+        same_house = self.squares[:, :, None] == self.squares[:, None, :]
+        between = BETWEEN[self.varys] & same_house
+
+        return np.where(self.get_moves(), between.sum(axis=2) + 1, 0)
+
+    def get_gains(self, banner_weight, card_weight):
+        '''
+        This function scores the immediate gain of each move for the player to move.
+
+        Parameters:
+            banner_weight (float): weight of a banner
+            card_weight (float): weight of a card in hand
+
+        Returns:
+            gains (ndarray): gains[i, s] is the gain of banners and cards in hand
+                of selecting square s in game i, -inf for illegal moves
+        '''
+
+        games = np.arange(len(self))
+        captures = self.get_captures()
+        mover = self.player - 1
+
+        houses = np.where(self.squares == EMPTY, 0, self.squares).astype(np.int64)
+        mine = self.hands[games, mover][games[:, None], houses] + captures
+        theirs = self.hands[games, 1 - mover][games[:, None], houses]
+        owner = self.banners[games[:, None], houses]
+
+        # Only the house of the selected card can change hands, see BoardState.make_move
+        player = self.player[:, None]
+        before = np.where(owner == player, 1, np.where(owner == 0, 0, -1))
+        after = np.where(mine >= theirs, 1, -1)
+
+        gains = (after - before) * banner_weight + captures * card_weight
+
+        return np.where(captures > 0, gains.astype(np.float64), -np.inf)
+
+    def play(self, moves):
+        '''
+        This function plays one move in every game that is not over.
+
+        Parameters:
+            moves (ndarray): square of the selected card of each game
+        '''
+
+        games = np.flatnonzero(~self.over)
+        moves = np.asarray(moves)[games]
+        varys = self.varys[games]
+        player = self.player[games]
+        mover = player - 1
+
+        house = self.squares[games, moves]
+        captured = BETWEEN[varys, moves] & (self.squares[games] == house[:, None])
+        captured[np.arange(len(games)), moves] = True
+
+        self.squares[games] = np.where(captured, EMPTY, self.squares[games])
+        self.hands[games, mover, house] += captured.sum(axis=1, dtype=np.int16)
+
+        # The player with more cards of the house gets the banner, the mover on a tie
+        mine = self.hands[games, mover, house]
+        theirs = self.hands[games, 1 - mover, house]
+        self.banners[games, house] = np.where(mine >= theirs, player, 3 - player)
+
+        self.varys[games] = moves
+        self.player[games] = 3 - player
+        self.over[games] = ~self.get_moves()[games].any(axis=1)
+
+    def get_winners(self):
+        '''
+        This function determines the winner of every game with the rules of calculate_winner.
+
+        Returns:
+            winners (ndarray): 1 or 2, or 0 if nobody holds a banner
+        '''
+
+        diff = (self.banners == 1).sum(axis=1) - (self.banners == 2).sum(axis=1)
+
+        # On a tie, the holder of the banner of the largest house wins
+        first = np.argmax(self.banners != 0, axis=1)
+        tiebreak = self.banners[np.arange(len(self)), first]
+
+        return np.where(diff > 0, 1, np.where(diff < 0, 2, tiebreak)).astype(np.int8)
+
+
+def random_policy(batch, rng):
+    '''
+    This function picks a legal move at random in every game.
+
+    Parameters:
+        batch (GameBatch): the games
+        rng (Generator): NumPy random generator
+
+    Returns:
+        moves (ndarray): selected square of each game
+    '''
+
+    return np.argmax(np.where(batch.get_moves(), rng.random((len(batch), NUM_SQUARES)), -1), axis=1)
+
+
+def greedy_policy(batch, rng, banner_weight=10, card_weight=1):
+    '''
+    This function picks the move with the best immediate gain, at random among the best.
+
+    Parameters:
+        batch (GameBatch): the games
+        rng (Generator): NumPy random generator
+        banner_weight (float): weight of a banner
+        card_weight (float): weight of a card in hand
+
+    Returns:
+        moves (ndarray): selected square of each game
+    '''
+
+    gains = batch.get_gains(banner_weight, card_weight)
+
+    return np.argmax(gains + rng.random(gains.shape) * 0.5, axis=1)
+
+
+def shallow_policy(batch, rng, banner_weight=10, card_weight=1):
+    '''
+    This function picks the move with the best gain after the best immediate reply.
+
+    Every legal move of every game is played in one batch of games, in which
+    the gain of the best reply of the opponent is taken off the gain of the
+    move; a move that ends the game scores the result instead.
+
+    Parameters:
+        batch (GameBatch): the games
+        rng (Generator): NumPy random generator
+        banner_weight (float): weight of a banner
+        card_weight (float): weight of a card in hand
+
+    Returns:
+        moves (ndarray): selected square of each game
+    '''
+
+    gains = batch.get_gains(banner_weight, card_weight)
+    games, moves = np.nonzero(np.isfinite(gains) & ~batch.over[:, None])
+
+    children = batch.take(games)
+    children.play(moves)
+
+    replies = children.get_gains(banner_weight, card_weight).max(axis=1)
+    won = children.get_winners() == batch.player[games]
+
+    scores = np.full(gains.shape, -np.inf)
+    scores[games, moves] = np.where(children.over, np.where(won, WIN_GAIN, -WIN_GAIN), gains[games, moves] - replies)
+
+    return np.argmax(scores + rng.random(gains.shape) * 0.5, axis=1)
+
+
+POLICIES = {'random': random_policy, 'greedy': greedy_policy, 'shallow': shallow_policy}
+
+
+def play_batch(batch, policies, rng):
+    '''
+    This function plays games to the end between two policies.
+
+    Parameters:
+        batch (GameBatch): the games, changed in place
+        policies (tuple): policies of player 1 and player 2
+        rng (Generator): NumPy random generator
+
+    Returns:
+        winners (ndarray): winner of each game, 1 or 2 (0 if nobody holds a banner)
+    '''
+
+    while not batch.over.all():
+        moves = np.zeros(len(batch), dtype=np.int64)
+
+        for player, policy in enumerate(policies, 1):
+            turn = (batch.player == player) & ~batch.over
+
+            if turn.any():
+                moves = np.where(turn, policy(batch, rng), moves)
+
+        batch.play(moves)
+
+    return batch.get_winners()
+
+
+def play_games(count, policies, seed=0):
+    '''
+    This function plays games on random boards between two policies.
+
+    Parameters:
+        count (int): number of games
+        policies (tuple): policies of player 1 and player 2
+        seed (int): seed of the random generator
+
+    Returns:
+        winners (ndarray): winner of each game, 1 or 2 (0 if nobody holds a banner)
+    '''
+
+    rng = np.random.default_rng(seed)
+
+    return play_batch(GameBatch.random(count, rng), policies, rng)
@@ -0,0 +1,150 @@
+'''
+Sequential probability ratio test of a match between two agents.
+
+The test decides between H0: the Elo difference of player 1 over player 2
+is elo0, and H1: it is elo1, with error rates alpha (accepting H1 when H0
+holds) and beta (accepting H0 when H1 holds). After each sample, the log
+likelihood ratio (LLR) of H1 over H0 is compared to the bounds
+log(beta / (1 - alpha)) and log((1 - beta) / alpha), and the match stops
+as soon as it leaves them.
+
+A sample is the score of player 1 in [0, 1]: 1 or 0 for a game, or the
+mean score of a pair of games. The LLR is the normal approximation of the
+generalized SPRT, which holds for both. get_elo_interval gives the Elo
+estimate with error bars from the same samples.
+'''
+
+import math
+
+
+def elo_to_score(elo):
+    '''
+    This function converts an Elo difference to the expected score.
+
+    Parameters:
+        elo (float): Elo difference of player 1 over player 2
+
+    Returns:
+        score (float): expected score of player 1, in (0, 1)
+    '''
+
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def score_to_elo(score):
+    '''
+    This function converts a mean score to an Elo difference.
+
+    Parameters:
+        score (float): mean score of player 1, in (0, 1)
+
+    Returns:
+        elo (float): Elo difference of player 1 over player 2
+    '''
+
+    return -400 * math.log10(1 / score - 1)
+
+
+def get_elo_interval(scores, z=1.96):
+    '''
+    This function estimates the Elo difference of player 1 with a confidence interval.
+
+    The mean and variance of the scores count one win and one loss more,
+    as in SPRT, and the interval is the one of the mean score (normal
+    approximation) converted to Elo.
+
+    Parameters:
+        scores (list): samples of the score of player 1, in [0, 1]
+        z (float): half width of the interval in standard errors, 1.96 for 95%
+
+    Returns:
+        elo (float): estimated Elo difference of player 1 over player 2
+        low (float): lower end of the interval
+        high (float): upper end of the interval
+    '''
+
+    samples = len(scores) + 2
+    mean = (sum(scores) + 1) / samples
+    variance = (sum(score * score for score in scores) + 1) / samples - mean * mean
+    error = z * math.sqrt(variance / samples)
+
+    # Keep the ends of the interval inside (0, 1), where the Elo is finite
+    low = max(mean - error, 1e-6)
+    high = min(mean + error, 1 - 1e-6)
+
+    return score_to_elo(mean), score_to_elo(low), score_to_elo(high)
+
+
+class SPRT:
+    '''
+    Running SPRT between the Elo differences elo0 (H0) and elo1 (H1).
+
+    Only the number of samples and the sums of the scores and of their
+    squares are kept. The mean and variance of the scores count one win and
+    one loss more than the samples, which keeps the test from stopping on a
+    few identical scores.
+    '''
+
+    def __init__(self, elo0, elo1, alpha=0.05, beta=0.05):
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.alpha = alpha
+        self.beta = beta
+
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+
+        self.samples = 0
+        self.total = 0.0
+        self.total_squares = 0.0
+
+    def add(self, score):
+        '''
+        This function adds a sample.
+
+        Parameters:
+            score (float): score of player 1 in the sample, in [0, 1]
+        '''
+
+        self.samples += 1
+        self.total += score
+        self.total_squares += score * score
+
+    def get_llr(self):
+        '''
+        This function computes the log likelihood ratio of H1 over H0.
+
+        Returns:
+            llr (float): the LLR, 0 before the first sample
+        '''
+
+        if self.samples == 0:
+            return 0.0
+
+        samples = self.samples + 2
+        mean = (self.total + 1) / samples
+        variance = (self.total_squares + 1) / samples - mean * mean
+
+        score0 = elo_to_score(self.elo0)
+        score1 = elo_to_score(self.elo1)
+
+        return self.samples * (score1 - score0) * (2 * mean - score0 - score1) / (2 * variance)
+
+    def get_result(self):
+        '''
+        This function tells whether the test is decided.
+
+        Returns:
+            result (str): 'H1' if the LLR is above the upper bound, 'H0' if it
+                is below the lower bound, None while it is between them
+        '''
+
+        llr = self.get_llr()
+
+        if llr >= self.upper:
+            return 'H1'
+
+        if llr <= self.lower:
+            return 'H0'
+
+        return None
@@ -0,0 +1,186 @@
+'''
+Results of the tournaments of main_tester.py in a SQLite file.
+
+Each game is written as soon as it ends, keyed by the agents, the
+configuration of the match (module constants and settings of each agent,
+time limit, loaded board), the seed of its board and the seats. A run with
+--store skips the games already in the file for the same key, so an
+interrupted tournament resumes where it stopped, and the results can be
+reported without playing them again.
+
+Usage:
+    python store.py results.db
+    python store.py results.db --player1 minimax2 --player2 minimax --configs
+'''
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import time
+
+from tournament import GameResult, get_summary
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS games (
+    player1 TEXT NOT NULL,
+    player2 TEXT NOT NULL,
+    config TEXT NOT NULL,
+    seed INTEGER NOT NULL,
+    swapped INTEGER NOT NULL,
+    game INTEGER NOT NULL,
+    winner INTEGER NOT NULL,
+    banners1 INTEGER NOT NULL,
+    banners2 INTEGER NOT NULL,
+    time REAL NOT NULL,
+    played REAL NOT NULL,
+    PRIMARY KEY (player1, player2, config, seed, swapped)
+)
+'''
+
+# Types of the module constants recorded in the configuration of an agent
+CONFIG_TYPES = (bool, int, float, str, type(None))
+
+
+def get_agent_config(agent, settings=None):
+    '''
+    This function records the configuration of an agent.
+
+    Parameters:
+        agent (module): the agent module
+        settings (dict): module attributes set in the worker of the agent
+
+    Returns:
+        config (dict): upper-case constants of the module by name, after the settings
+    '''
+
+    config = {name: value for name, value in vars(agent).items()
+              if name.isupper() and isinstance(value, CONFIG_TYPES)}
+    config.update(settings or {})
+
+    return config
+
+
+def get_match_config(player1_config, player2_config, timeout, load):
+    '''
+    This function builds the key of the configuration of a match.
+
+    Parameters:
+        player1_config (dict): configuration of the agent of player 1, see get_agent_config
+        player2_config (dict): configuration of the agent of player 2
+        timeout (float): time limit of a move in seconds
+        load (str): board file played in every game, or None
+
+    Returns:
+        config (str): the configuration as canonical JSON
+    '''
+
+    return json.dumps({'player1': player1_config, 'player2': player2_config, 'timeout': timeout, 'load': load},
+                      sort_keys=True)
+
+
+def get_config_id(config):
+    '''
+    This function gives a short id to a configuration, for the reports.
+
+    Parameters:
+        config (str): configuration, see get_match_config
+
+    Returns:
+        config_id (str): first hex digits of its SHA-1
+    '''
+
+    return hashlib.sha1(config.encode()).hexdigest()[:8]
+
+
+class ResultStore:
+    '''
+    Results of games in a SQLite file, one row per game.
+    '''
+
+    def __init__(self, filename):
+        self.connection = sqlite3.connect(filename)
+        self.connection.execute(SCHEMA)
+        self.connection.commit()
+
+    def get_results(self, player1, player2, config):
+        '''
+        This function reads the games of a match.
+
+        Parameters:
+            player1 (str): module of the agent of player 1
+            player2 (str): module of the agent of player 2
+            config (str): configuration of the match, see get_match_config
+
+        Returns:
+            results (list): list of GameResult, by number of game
+        '''
+
+        rows = self.connection.execute(
+            'SELECT game, seed, swapped, winner, banners1, banners2, time FROM games '
+            'WHERE player1 = ? AND player2 = ? AND config = ? ORDER BY game', (player1, player2, config))
+
+        return [GameResult(game, seed, bool(swapped), *row) for game, seed, swapped, *row in rows]
+
+    def add_result(self, player1, player2, config, result):
+        '''
+        This function writes the result of a game, replacing a game on the same board and seats.
+
+        Parameters:
+            player1 (str): module of the agent of player 1
+            player2 (str): module of the agent of player 2
+            config (str): configuration of the match, see get_match_config
+            result (GameResult): result of the game
+        '''
+
+        self.connection.execute('INSERT OR REPLACE INTO games VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                (player1, player2, config, result.seed, result.swapped, result.game, result.winner,
+                                 result.banners1, result.banners2, result.time, time.time()))
+
+        # One transaction per game, so a killed run keeps all its finished games
+        self.connection.commit()
+
+    def get_matches(self):
+        '''
+        This function lists the matches in the file.
+
+        Returns:
+            matches (list): (player1, player2, config) tuples
+        '''
+
+        return self.connection.execute('SELECT DISTINCT player1, player2, config FROM games '
+                                       'ORDER BY player1, player2').fetchall()
+
+    def close(self):
+        '''
+        This function closes the file.
+        '''
+
+        self.connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reports the games stored by main_tester.py --store")
+    parser.add_argument('filename', type=str, help="SQLite file of the results")
+    parser.add_argument('--player1', type=str, help="only the matches of this agent as player 1", default=None)
+    parser.add_argument('--player2', type=str, help="only the matches of this agent as player 2", default=None)
+    parser.add_argument('--configs', action='store_true', help="print the configuration of each match")
+    args = parser.parse_args()
+
+    store = ResultStore(args.filename)
+
+    for player1, player2, config in store.get_matches():
+        if args.player1 not in (None, player1) or args.player2 not in (None, player2):
+            continue
+
+        summary = get_summary(store.get_results(player1, player2, config))
+
+        print(f"{player1} vs {player2} [{get_config_id(config)}]: {summary['games']} games, "
+              f"wins {summary['wins'][0]} : {summary['wins'][1]}, "
+              f"banner margin of player 1 {summary['margin']:+.2f} per game, "
+              f"first player won {summary['first_wins'] / max(summary['games'], 1):.0%}")
+
+        if args.configs:
+            print(f"    {config}")
+
+    store.close()
@@ -0,0 +1,354 @@
+'''
+Tournaments of many games between two agents, spread over worker processes.
+
+main_tester.py hands the games of a run to a Tournament. Each game has a
+seed derived from the seed of the run and the number of the game, and its
+board is made from that seed, so game n is played on the same board
+whatever the number of workers and the order in which the games finish.
+Each worker process hosts one AgentProcess per player, kept for all of its
+games, and sends back the result of each game as soon as it ends, so the
+results are streamed in the order the games finish.
+
+In a paired tournament, games 2n and 2n + 1 are played on the same board
+with the seats swapped, so that the luck of the board and the advantage of
+moving first cancel out in the score of the pair.
+'''
+
+import multiprocessing
+import os
+import queue
+import random
+import threading
+import time
+import traceback
+from collections import namedtuple
+
+from utils.classes import Player
+from rules import make_board, load_board, get_possible_moves, calculate_winner, make_move, set_banners
+from harness import AgentProcess, _watch_harness
+
+# Result of a game: winner is 1 or 2, banners1 and banners2 are the banners of the players at the end,
+# swapped is True if the agent of player 2 moved first (the result is still given by agent)
+GameResult = namedtuple('GameResult', ('game', 'seed', 'swapped', 'winner', 'banners1', 'banners2', 'time'))
+
+
+def get_game_seed(seed, game):
+    '''
+    This function derives the seed of a game from the seed of the run.
+
+    Parameters:
+        seed (int): seed of the run
+        game (int): number of the game
+
+    Returns:
+        game_seed (int): seed of the board of the game
+    '''
+
+    return random.Random(f"{seed}:{game}").getrandbits(32)
+
+
+def get_game_setup(seed, game, paired):
+    '''
+    This function gives the board and the seats of a game.
+
+    Parameters:
+        seed (int): seed of the run
+        game (int): number of the game
+        paired (bool): True if each board is played twice, with the seats swapped
+
+    Returns:
+        game_seed (int): seed of the board of the game
+        swapped (bool): True if the agent of player 2 moves first
+    '''
+
+    if paired:
+        return get_game_seed(seed, game // 2), game % 2 == 1
+
+    return get_game_seed(seed, game), False
+
+
+def get_sample(result, pending, paired):
+    '''
+    This function scores a game for player 1, alone or with the other game of its pair.
+
+    Parameters:
+        result (GameResult): result of the game
+        pending (dict): scores of the pairs with one game played, by pair
+        paired (bool): True if each board is played twice, with the seats swapped
+
+    Returns:
+        score (float): 1 or 0 for a game, the mean of the pair in a paired
+            tournament, or None while the other game of the pair is not played
+    '''
+
+    score = 1.0 if result.winner == 1 else 0.0
+
+    if not paired:
+        return score
+
+    pair = result.game // 2
+
+    if pair not in pending:
+        pending[pair] = score
+        return None
+
+    return (pending.pop(pair) + score) / 2
+
+
+def play_game(cards, player1_agent, player2_agent, timeout):
+    '''
+    This function plays a game between two agents, with the loop of main_tester.py.
+
+    Parameters:
+        cards (list): list of Card objects, the board (changed in place)
+        player1_agent (AgentProcess): agent of player 1
+        player2_agent (AgentProcess): agent of player 2
+        timeout (float): time limit of a move in seconds
+
+    Returns:
+        winner (int): 1 or 2
+        banners1 (int): banners of player 1
+        banners2 (int): banners of player 2
+    '''
+
+    player1 = Player(player1_agent.module_name)
+    player2 = Player(player2_agent.module_name)
+
+    turn = 1 # 1: player 1's turn, 2: player 2's turn
+
+    while True:
+        moves = get_possible_moves(cards)
+
+        if len(moves) == 0:
+            winner = calculate_winner(player1, player2)
+
+            return winner, sum(player1.get_banners().values()), sum(player2.get_banners().values())
+
+        agent = player1_agent if turn == 1 else player2_agent
+        move = agent.get_move(cards, player1, player2, timeout, turn)
+
+        # A move out of time or not on the board passes the turn
+        if move in moves:
+            selected_house = make_move(cards, move, player1 if turn == 1 else player2)
+            set_banners(player1, player2, selected_house, turn)
+
+        turn = 2 if turn == 1 else 1
+
+
+def _tournament_worker(tasks, results, harness_pid, worker, player1, player2, settings, timeout, load):
+    '''
+    This function plays the games of a tournament in a worker process.
+
+    Tasks are (game, seed, swapped) tuples, None ends the worker. For each game
+    ('game', worker, stats, GameResult) or ('error', game, traceback) is put
+    on results, and ('done', worker, stats) before the worker ends, stats
+    being the moves, timeouts and overhead of each AgentProcess so far.
+
+    Parameters:
+        tasks (Queue): games to play
+        results (Queue): results of the games
+        harness_pid (int): process id of the tournament
+        worker (int): number of the worker
+        player1 (str): module of the agent of player 1
+        player2 (str): module of the agent of player 2
+        settings (tuple): module attributes of the agents of player 1 and player 2, see AgentProcess
+        timeout (float): time limit of a move in seconds
+        load (str): board file played in every game, or None for the boards of the seeds
+    '''
+
+    # Lead a process group and end with the tournament, as the agent workers do
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()
+
+    threading.Thread(target=_watch_harness, args=(harness_pid,), daemon=True).start()
+
+    agents = (AgentProcess(player1, settings[0]), AgentProcess(player2, settings[1]))
+
+    def get_stats():
+        return [(agent.moves, agent.timeouts, agent.overhead) for agent in agents]
+
+    try:
+        while True:
+            task = tasks.get()
+
+            if task is None:
+                break
+
+            game, seed, swapped = task
+            start = time.perf_counter()
+
+            try:
+                cards = load_board(load) if load else make_board(random.Random(seed))
+
+                if swapped:
+                    winner, banners2, banners1 = play_game(cards, agents[1], agents[0], timeout)
+                    winner = 3 - winner
+
+                else:
+                    winner, banners1, banners2 = play_game(cards, agents[0], agents[1], timeout)
+
+            except Exception:
+                results.put(('error', game, traceback.format_exc()))
+                continue
+
+            result = GameResult(game, seed, swapped, winner, banners1, banners2, time.perf_counter() - start)
+            results.put(('game', worker, get_stats(), result))
+
+    finally:
+        results.put(('done', worker, get_stats()))
+
+        for agent in agents:
+            agent.close()
+
+
+def get_summary(results):
+    '''
+    This function aggregates the results of games.
+
+    Parameters:
+        results (list): list of GameResult
+
+    Returns:
+        summary (dict): games, wins of each player, mean banner margin of
+            player 1 (banners of player 1 minus those of player 2) over all
+            the games and over the wins of each player, and wins of the
+            player who moved first
+    '''
+
+    margins = [result.banners1 - result.banners2 for result in results]
+    summary = {'games': len(results), 'wins': [0, 0], 'margin': 0.0, 'win_margins': [0.0, 0.0], 'first_wins': 0}
+
+    for result, margin in zip(results, margins):
+        summary['wins'][result.winner - 1] += 1
+        summary['win_margins'][result.winner - 1] += margin
+        summary['first_wins'] += (result.winner == 1) != result.swapped
+
+    for player in range(2):
+        summary['win_margins'][player] /= max(summary['wins'][player], 1)
+
+    summary['margin'] = sum(margins) / max(len(margins), 1)
+
+    return summary
+
+
+class Tournament:
+    '''
+    Games between two agents played by a number of worker processes.
+
+    settings holds the module attributes set in each agent (e.g. TIMEOUT),
+    results the GameResult of the games played, and agents the moves,
+    timeouts and harness overhead of each seat added up over the workers
+    (up to the last game of each worker, if the games are stopped early).
+    '''
+
+    def __init__(self, player1, player2, workers=1, timeout=10, load=None, settings=None):
+        self.player1 = player1
+        self.player2 = player2
+        self.settings = settings or ({}, {})
+        self.workers = workers
+        self.timeout = timeout
+        self.load = load
+
+        self.results = []
+        self.agents = [[player1, 0, 0, 0.0], [player2, 0, 0, 0.0]]
+        self.worker_stats = {}  # Latest statistics by number of worker, over all the calls of play
+
+    def play(self, games, seed=0, paired=False):
+        '''
+        This function plays games and yields their results as they finish.
+
+        Stopping the iteration early ends the workers, and the games still
+        being played are dropped.
+
+        Parameters:
+            games (iterable): numbers of the games to play
+            seed (int): seed of the run, see get_game_seed
+            paired (bool): True to play each board twice, with the seats swapped, see get_game_setup
+
+        Yields:
+            result (GameResult): result of a game
+        '''
+
+        tasks = multiprocessing.Queue()
+        results = multiprocessing.Queue()
+        count = 0
+
+        for game in games:
+            tasks.put((game, *get_game_setup(seed, game, paired)))
+            count += 1
+
+        workers = []
+        for _ in range(min(self.workers, count)):
+            tasks.put(None)
+
+            # Not a daemon, so that the worker can start the processes of the agents
+            worker = multiprocessing.Process(target=_tournament_worker,
+                                             args=(tasks, results, os.getpid(), len(self.worker_stats), self.player1,
+                                                   self.player2, self.settings, self.timeout, self.load))
+            worker.start()
+            workers.append(worker)
+
+            self.worker_stats[len(self.worker_stats)] = [(0, 0, 0.0), (0, 0, 0.0)]
+
+        running = len(workers)
+
+        try:
+            while running:
+                try:
+                    message = results.get(timeout=1)
+
+                except queue.Empty:
+                    if not any(worker.is_alive() for worker in workers):
+                        raise RuntimeError("The tournament workers have stopped.")
+
+                    continue
+
+                if message[0] == 'error':
+                    raise RuntimeError(f"Game {message[1]} failed:\n{message[2]}")
+
+                self.add_stats(message[1], message[2])
+
+                if message[0] == 'game':
+                    self.results.append(message[3])
+                    yield message[3]
+
+                else:
+                    running -= 1
+
+        finally:
+            # The agents of a killed worker end by themselves once it is gone
+            for worker in workers:
+                if worker.is_alive() and running:
+                    worker.kill()
+
+                worker.join()
+
+            # The tasks not read by the killed workers are dropped, instead of
+            # waiting at exit for a feeder thread that can no longer flush them
+            if running:
+                tasks.cancel_join_thread()
+
+    def add_stats(self, worker, stats):
+        '''
+        This function updates the agent statistics with the latest ones of a worker.
+
+        Parameters:
+            worker (int): number of the worker
+            stats (list): moves, timeouts and overhead of each agent of the worker so far
+        '''
+
+        for seat, before, after in zip(self.agents, self.worker_stats[worker], stats):
+            for index in range(3):
+                seat[index + 1] += after[index] - before[index]
+
+        self.worker_stats[worker] = stats
+
+    def get_summary(self):
+        '''
+        This function aggregates the results of the games played, see get_summary.
+
+        Returns:
+            summary (dict): summary of the results
+        '''
+
+        return get_summary(self.results)
@@ -0,0 +1,144 @@
+'''
+Transposition table for the search, keyed by the Zobrist hash of BoardState.
+
+The table is a fixed array of two-entry buckets sized from a memory cap. The
+first entry of a bucket is depth-preferred: it is only replaced by a deeper
+search, or by any search once it is from an older get_move (age). The second
+entry is always replaced.
+'''
+
+# Bound types of the stored scores
+EXACT = 0
+LOWER = 1  # The score is a lower bound (the search failed high)
+UPPER = 2  # The score is an upper bound (the search failed low)
+
+# Approximate size of one entry in bytes: the entry tuple, its key and
+# score objects and the slot of the table list
+ENTRY_BYTES = 176
+
+DEFAULT_SIZE_MB = 64
+
+
+class TranspositionTable:
+    '''
+    Bounded transposition table with depth-preferred and always-replace entries.
+
+    Entries are tuples (key, depth, flag, score, move, age).
+    '''
+
+    def __init__(self, size_mb=DEFAULT_SIZE_MB):
+        # Number of buckets: the largest power of two that fits in the memory cap
+        buckets = max(1, int(size_mb * 1024 * 1024) // (2 * ENTRY_BYTES))
+        self.buckets = 1 << (buckets.bit_length() - 1)
+        self.mask = self.buckets - 1
+
+        self.table = [None] * (2 * self.buckets)
+        self.age = 0
+
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.replacements = 0
+
+    def new_search(self):
+        '''
+        This function starts a new search, so older entries become replaceable.
+        '''
+
+        self.age += 1
+
+    def probe(self, key):
+        '''
+        This function looks up a position.
+
+        Parameters:
+            key (int): hash of the position
+
+        Returns:
+            entry (tuple): (key, depth, flag, score, move, age), or None on a miss
+        '''
+
+        self.probes += 1
+
+        index = (key & self.mask) << 1
+        table = self.table
+
+        entry = table[index]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+
+        entry = table[index + 1]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+
+        return None
+
+    def store(self, key, depth, flag, score, move):
+        '''
+        This function stores the result of a search.
+
+        Parameters:
+            key (int): hash of the position
+            depth (int): depth of the search
+            flag (int): EXACT, LOWER or UPPER
+            score (float): score of the position
+            move (int): best move found, or None
+        '''
+
+        self.stores += 1
+
+        index = (key & self.mask) << 1
+        table = self.table
+        entry = (key, depth, flag, score, move, self.age)
+
+        preferred = table[index]
+
+        # Replace the depth-preferred entry if it is empty, the same position,
+        # from an older search, or not deeper than the new one
+        if preferred is None or preferred[0] == key or preferred[5] != self.age or preferred[1] <= depth:
+            if preferred is not None and preferred[0] != key:
+                self.replacements += 1
+
+            table[index] = entry
+
+        else:
+            if table[index + 1] is not None and table[index + 1][0] != key:
+                self.replacements += 1
+
+            table[index + 1] = entry
+
+    def clear(self):
+        '''
+        This function empties the table and resets its statistics.
+        '''
+
+        self.table = [None] * (2 * self.buckets)
+        self.age = 0
+
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.replacements = 0
+
+    def get_stats(self):
+        '''
+        This function gets the usage statistics of the table.
+
+        Returns:
+            stats (dict): probes, hits, hit rate, stores, replacements,
+                capacity and number of filled entries
+        '''
+
+        filled = sum(1 for entry in self.table if entry is not None)
+
+        return {
+            'probes': self.probes,
+            'hits': self.hits,
+            'hit_rate': self.hits / self.probes if self.probes else 0.0,
+            'stores': self.stores,
+            'replacements': self.replacements,
+            'capacity': len(self.table),
+            'filled': filled,
+        }
@@ -0,0 +1,123 @@
+'''
+Card and Player classes of the game.
+
+Both classes use __slots__ and store the house of a card as an interned id,
+so a game state is a few small objects. A player keeps the number of cards
+of each house next to the lists of cards, so counts are O(1), and both
+classes copy themselves in copy.deepcopy without the generic reduce
+protocol, which try_get_move and the list-based search call at every move.
+'''
+
+HOUSES = ('Stark', 'Greyjoy', 'Lannister', 'Targaryen', 'Baratheon', 'Tyrell', 'Tully')
+
+# Ids of the houses, Varys comes after the seven houses
+HOUSE_IDS = {house: house_id for house_id, house in enumerate(HOUSES + ('Varys',))}
+HOUSE_NAMES = HOUSES + ('Varys',)
+
+
+class Card:
+    '''
+    A character card: house, name and location (square) on the board.
+
+    Collected cards keep the location they were taken from.
+    '''
+
+    __slots__ = ('house_id', 'name', 'location')
+
+    def __init__(self, house, name, location):
+        self.house_id = HOUSE_IDS[house]
+        self.name = name
+        self.location = location
+
+    def __deepcopy__(self, memo):
+        card = memo.get(id(self))
+
+        if card is None:
+            card = Card.__new__(Card)
+            card.house_id = self.house_id
+            card.name = self.name
+            card.location = self.location
+            memo[id(self)] = card
+
+        return card
+
+    def get_house(self):
+        return HOUSE_NAMES[self.house_id]
+
+    def get_house_id(self):
+        return self.house_id
+
+    def get_name(self):
+        return self.name
+
+    def get_location(self):
+        return self.location
+
+    def set_location(self, location):
+        self.location = location
+
+
+class Player:
+    '''
+    A player: agent name, collected cards by house and banners by house.
+
+    get_cards and get_banners return the dictionaries themselves, keyed by
+    house name; cards must be collected with add_card so that the counts
+    stay in step with the lists.
+    '''
+
+    __slots__ = ('agent', 'cards', 'banners', 'counts')
+
+    def __init__(self, agent):
+        self.agent = agent
+        self.cards = {house: [] for house in HOUSES}
+        self.banners = {house: 0 for house in HOUSES}
+        self.counts = [0] * len(HOUSES)
+
+    def __deepcopy__(self, memo):
+        player = memo.get(id(self))
+
+        if player is None:
+            player = Player.__new__(Player)
+            player.agent = self.agent
+            player.cards = {house: [card.__deepcopy__(memo) for card in cards] for house, cards in self.cards.items()}
+            player.banners = self.banners.copy()
+            player.counts = self.counts[:]
+            memo[id(self)] = player
+
+        return player
+
+    def get_agent(self):
+        return self.agent
+
+    def get_cards(self):
+        return self.cards
+
+    def get_banners(self):
+        return self.banners
+
+    def get_card_count(self, house=None):
+        '''
+        This function counts the collected cards in O(1).
+
+        Parameters:
+            house (str): house of the cards, or None for all the cards
+
+        Returns:
+            count (int): number of cards
+        '''
+
+        if house is None:
+            return sum(self.counts)
+
+        return self.counts[HOUSE_IDS[house]]
+
+    def add_card(self, card):
+        self.cards[card.get_house()].append(card)
+        self.counts[card.house_id] += 1
+
+    def get_house_banner(self, house):
+        self.banners[house] = 1
+
+    def remove_house_banner(self, house):
+        self.banners[house] = 0